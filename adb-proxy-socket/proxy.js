@@ -34,15 +34,54 @@ const io = new Server(server, {
 });
 
 const PORT = 3001;
-// Track clients by application
+
+// Error codes sent back right away, in place of a response, when a command
+// can not be delivered to an instance of its application
+const NO_HOST = "NO_HOST";
+const HOST_BUSY = "HOST_BUSY";
+const HOST_STALE = "HOST_STALE";
+const DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED";
+
+// Error code of the response to a command cancelled while it was queued
+const CANCELLED = "CANCELLED";
+
+// Most commands an instance is sent at a time. Commands past this wait in
+// a queue for the instance, in the order they arrived.
+const MAX_IN_FLIGHT = 8;
+
+// Most commands that can wait in an instance's queue before new ones are
+// refused with HOST_BUSY
+const MAX_QUEUED = 100;
+
+// Heartbeats an instance can miss before it is considered stale
+const MISSED_HEARTBEATS = 3;
+
+// How often, in milliseconds, instances are checked for missed heartbeats
+const PRESENCE_CHECK_INTERVAL = 1000;
+
+// Socket.IO room for clients that want presence updates
+const PRESENCE_ROOM = "presence";
+
+// Plugin instances by application. Each is a Map of socket id to
+// { socketId, instanceId, inFlight, queue, lastUsed, heartbeatInterval,
+// lastSeen, stale }. queue holds the packets waiting to be sent to the
+// instance.
 const applicationClients = {};
 
+// requestId -> { socketId, senderId } for commands sent to an instance and
+// not yet answered. Used to track how busy each instance is.
+const pendingRequests = new Map();
+
+// "application:routingKey" -> socket id, so commands that share a routing
+// key (for example a document) keep going to the same instance
+const stickyRoutes = new Map();
+
 io.on("connection", (socket) => {
     console.log(`User connected: ${socket.id}`);
 
-    socket.on("register", ({ application }) => {
+    socket.on("register", ({ application, instanceId, heartbeatInterval }) => {
         console.log(
-            `Client ${socket.id} registered for application: ${application}`
+            `Client ${socket.id} registered for application: ${application}, instance: ${instanceId}`
         );
 
         // Store the application preference with this socket
@@ -50,9 +89,21 @@ io.on("connection", (socket) => {
 
         // Register this client for this application
         if (!applicationClients[application]) {
-            applicationClients[application] = new Set();
+            applicationClients[application] = new Map();
         }
-        applicationClients[application].add(socket.id);
+        applicationClients[application].set(socket.id, {
+            socketId: socket.id,
+            instanceId: instanceId || socket.id,
+            inFlight: 0,
+            queue: [],
+            lastUsed: 0,
+            //plugins that do not send heartbeats are never marked stale
+            heartbeatInterval: heartbeatInterval || 0,
+            lastSeen: Date.now(),
+            stale: false,
+        });
+
+        broadcastPresence();
 
         // Optionally confirm registration
         socket.emit("registration_response", {
@@ -62,18 +113,66 @@ io.on("connection", (socket) => {
         });
     });
 
+    socket.on("heartbeat", () => {
+        markSeen(socket);
+    });
+
+    //clients that join the presence room get the instances connected for
+    //each application now, and again every time that changes
+    socket.on("presence_subscribe", () => {
+        socket.join(PRESENCE_ROOM);
+        socket.emit("presence", getPresence());
+    });
+
+    //forwards a cancel to the instance running the command. The command's
+    //own response tells the sender whether it was stopped. The ack says
+    //whether the command was found.
+    socket.on("cancel_command", ({ requestId }, ack) => {
+        const request = pendingRequests.get(requestId);
+        let found = request !== undefined && request.senderId === socket.id;
+
+        if (found) {
+            console.log(`Cancelling request ${requestId}`);
+            io.to(request.socketId).emit("cancel_command", { requestId });
+        } else if (removeQueued(requestId, socket.id)) {
+            //it never reached the instance, so the proxy answers for it
+            found = true;
+            console.log(`Cancelled queued request ${requestId}`);
+            io.to(socket.id).emit("packet_response", {
+                senderId: socket.id,
+                requestId: requestId,
+                status: "FAILURE",
+                errorCode: CANCELLED,
+                message: "The command was cancelled before it was sent",
+            });
+        } else {
+            console.log(`No running request to cancel: ${requestId}`);
+        }
+
+        if (typeof ack === "function") {
+            ack({ found });
+        }
+    });
+
     socket.on("command_packet_response", ({ packet }) => {
         const senderId = packet.senderId;
 
+        markSeen(socket);
+        completeRequest(packet.requestId);
+
+        //the packet is forwarded as is, so binary attachments such as
+        //images go through without being re-encoded
         if (senderId) {
             io.to(senderId).emit("packet_response", packet);
-            console.log(`Sent confirmation to client ${senderId}`);
+            console.log(
+                `Sent response for request ${packet.requestId} to client ${senderId}`
+            );
         } else {
             console.log(`No sender ID provided in packet`);
         }
     });
 
-    socket.on("command_packet", ({ application, command }) => {
+    socket.on("command_packet", ({ application, command, requestId }) => {
         console.log(
             `Command from ${socket.id} for application ${application}:`,
             command
@@ -87,12 +186,28 @@ io.on("connection", (socket) => {
 
         // Process the command
 
+        //requestId is echoed back by the plugin so the sender can match
+        //responses when it has more than one command in flight
         let packet = {
             senderId: socket.id,
+            requestId: requestId || command.requestId,
             application: application,
             command: command,
         };
 
+        //the sender has stopped waiting, so running it would only compete
+        //with the sender's retry
+        if (command.deadline && Date.now() > command.deadline) {
+            sendError(
+                packet,
+                DEADLINE_EXCEEDED,
+                `${command.action} was not sent to ${application} because its deadline passed ${
+                    Date.now() - command.deadline
+                } ms ago`
+            );
+            return;
+        }
+
         sendToApplication(packet);
 
         // Send response back to this client
@@ -102,6 +217,21 @@ io.on("connection", (socket) => {
     socket.on("disconnect", () => {
         console.log(`User disconnected: ${socket.id}`);
 
+        const application = socket.data.application;
+
+        // Commands still waiting for the instance will never be sent
+        const instance = applicationClients[application]?.get(socket.id);
+        if (instance) {
+            for (const packet of instance.queue) {
+                sendError(
+                    packet,
+                    NO_HOST,
+                    "The application instance the command was waiting for disconnected"
+                );
+            }
+            instance.queue = [];
+        }
+
         // Remove this client from all application registrations
         for (const app in applicationClients) {
             applicationClients[app].delete(socket.id);
@@ -110,28 +240,335 @@ io.on("connection", (socket) => {
                 delete applicationClients[app];
             }
         }
+
+        for (const [key, socketId] of stickyRoutes) {
+            if (socketId === socket.id) {
+                stickyRoutes.delete(key);
+            }
+        }
+
+        // Commands the instance was running will never be answered, so
+        // fail them now instead of leaving the senders to time out
+        for (const [requestId, request] of pendingRequests) {
+            if (request.socketId === socket.id) {
+                pendingRequests.delete(requestId);
+                io.to(request.senderId).emit("packet_response", {
+                    senderId: request.senderId,
+                    requestId: requestId,
+                    status: "FAILURE",
+                    message: "The application instance running the command disconnected",
+                });
+            }
+        }
+
+        if (application) {
+            broadcastPresence();
+        }
     });
 });
 
-// Add a function to send messages to clients by application
+//marks instances that stopped sending heartbeats as stale, and stale ones
+//that started again as live. Also answers queued commands whose deadline
+//has passed, since their senders have stopped waiting.
+setInterval(() => {
+    const now = Date.now();
+    let changed = false;
+
+    for (const application in applicationClients) {
+        for (const instance of applicationClients[application].values()) {
+            expireQueued(instance);
+
+            const stale =
+                instance.heartbeatInterval > 0 &&
+                now - instance.lastSeen >
+                    instance.heartbeatInterval * MISSED_HEARTBEATS;
+
+            if (stale !== instance.stale) {
+                instance.stale = stale;
+                changed = true;
+                console.log(
+                    `Instance ${instance.instanceId} for ${application} is ${
+                        stale ? "stale" : "live"
+                    }`
+                );
+            }
+        }
+    }
+
+    if (changed) {
+        broadcastPresence();
+    }
+}, PRESENCE_CHECK_INTERVAL);
+
+function markSeen(socket) {
+    const instance = applicationClients[socket.data.application]?.get(
+        socket.id
+    );
+    if (instance) {
+        instance.lastSeen = Date.now();
+    }
+}
+
+//application -> [{ instanceId, stale }] for every registered instance
+function getPresence() {
+    const presence = {};
+    for (const application in applicationClients) {
+        presence[application] = Array.from(
+            applicationClients[application].values(),
+            (instance) => ({
+                instanceId: instance.instanceId,
+                stale: instance.stale,
+            })
+        );
+    }
+    return presence;
+}
+
+function broadcastPresence() {
+    io.to(PRESENCE_ROOM).emit("presence", getPresence());
+}
+
+// Sends a command to one instance of its application. The instance is the
+// one named by command.instanceId if set, otherwise the instance already
+// used for command.routingKey, otherwise the least busy instance.
+//
+// If the instance already has MAX_IN_FLIGHT commands, the command waits in
+// its queue until one of them is answered. If no instance can take the
+// command, the sender gets a FAILURE response with an errorCode of NO_HOST,
+// HOST_BUSY or HOST_STALE right away.
 function sendToApplication(packet) {
     let application = packet.application;
-    if (applicationClients[application]) {
+    let { instance, errorCode } = selectInstance(
+        application,
+        packet.command || {}
+    );
+
+    if (!instance) {
+        sendError(packet, errorCode, getErrorMessage(errorCode, application));
+        return false;
+    }
+
+    if (instance.inFlight >= MAX_IN_FLIGHT) {
+        instance.queue.push(packet);
         console.log(
-            `Sending to ${applicationClients[application].size} clients for ${application}`
+            `Queued request ${packet.requestId} for instance ${instance.instanceId} (${instance.queue.length} waiting)`
         );
+        return true;
+    }
+
+    sendToInstance(instance, packet);
+    return true;
+}
+
+function sendToInstance(instance, packet) {
+    instance.inFlight++;
+    instance.lastUsed = Date.now();
 
-        let senderId = packet.senderId;
-        // Loop through all client IDs for this application
-        applicationClients[application].forEach((clientId) => {
-            io.to(clientId).emit("command_packet", packet);
+    if (packet.requestId) {
+        pendingRequests.set(packet.requestId, {
+            socketId: instance.socketId,
+            senderId: packet.senderId,
         });
-        return true;
     }
-    console.log(`No clients registered for application: ${application}`);
+
+    console.log(
+        `Sending request ${packet.requestId} to instance ${instance.instanceId} for ${packet.application} (${instance.inFlight} in flight)`
+    );
+
+    io.to(instance.socketId).emit("command_packet", packet);
+}
+
+//sends queued commands to an instance while it has room for them
+function sendQueued(instance) {
+    expireQueued(instance);
+
+    while (instance.queue.length > 0 && instance.inFlight < MAX_IN_FLIGHT) {
+        sendToInstance(instance, instance.queue.shift());
+    }
+}
+
+//answers queued commands whose deadline has passed and drops them
+function expireQueued(instance) {
+    const now = Date.now();
+
+    instance.queue = instance.queue.filter((packet) => {
+        const deadline = packet.command && packet.command.deadline;
+        if (!deadline || now <= deadline) {
+            return true;
+        }
+
+        sendError(
+            packet,
+            DEADLINE_EXCEEDED,
+            `${packet.command.action} waited for ${packet.application} until its deadline passed`
+        );
+        return false;
+    });
+}
+
+//removes a command from the queue it is waiting in. Returns false if no
+//command with the id from this sender is queued.
+function removeQueued(requestId, senderId) {
+    for (const application in applicationClients) {
+        for (const instance of applicationClients[application].values()) {
+            const index = instance.queue.findIndex(
+                (packet) =>
+                    packet.requestId === requestId &&
+                    packet.senderId === senderId
+            );
+
+            if (index !== -1) {
+                instance.queue.splice(index, 1);
+                return true;
+            }
+        }
+    }
+
     return false;
 }
 
+//commands sent to an instance or waiting for it
+function getLoad(instance) {
+    return instance.inFlight + instance.queue.length;
+}
+
+//returns { instance } for the instance to send the command to, or
+//{ errorCode } if there is none that can take it
+function selectInstance(application, command) {
+    const instances = applicationClients[application];
+    if (!instances || instances.size === 0) {
+        return { errorCode: NO_HOST };
+    }
+
+    if (command.instanceId) {
+        for (const instance of instances.values()) {
+            if (instance.instanceId === command.instanceId) {
+                return checkInstance(instance);
+            }
+        }
+        return { errorCode: NO_HOST };
+    }
+
+    const stickyKey = command.routingKey
+        ? `${application}:${command.routingKey}`
+        : null;
+
+    //a stale instance is given up on, and the key moves to a live one
+    if (stickyKey && stickyRoutes.has(stickyKey)) {
+        const instance = instances.get(stickyRoutes.get(stickyKey));
+        if (instance && !instance.stale) {
+            return checkInstance(instance);
+        }
+    }
+
+    //the instance the client's cached state came from, if it can take the
+    //command, so a new routing key starts out where that state is
+    let selected = null;
+    if (command.preferInstanceId) {
+        for (const instance of instances.values()) {
+            if (
+                instance.instanceId === command.preferInstanceId &&
+                !instance.stale &&
+                instance.queue.length < MAX_QUEUED
+            ) {
+                selected = instance;
+                break;
+            }
+        }
+    }
+
+    //otherwise the fewest commands in flight or queued, then the one that
+    //has waited longest
+    if (!selected) {
+        for (const instance of instances.values()) {
+            if (instance.stale) {
+                continue;
+            }
+
+            if (
+                !selected ||
+                getLoad(instance) < getLoad(selected) ||
+                (getLoad(instance) === getLoad(selected) &&
+                    instance.lastUsed < selected.lastUsed)
+            ) {
+                selected = instance;
+            }
+        }
+    }
+
+    if (!selected) {
+        return { errorCode: HOST_STALE };
+    }
+
+    if (selected.queue.length >= MAX_QUEUED) {
+        return { errorCode: HOST_BUSY };
+    }
+
+    if (stickyKey) {
+        stickyRoutes.set(stickyKey, selected.socketId);
+    }
+
+    return { instance: selected };
+}
+
+function checkInstance(instance) {
+    if (instance.stale) {
+        return { errorCode: HOST_STALE };
+    }
+
+    if (instance.queue.length >= MAX_QUEUED) {
+        return { errorCode: HOST_BUSY };
+    }
+
+    return { instance };
+}
+
+//replies to the sender of a command that was not delivered
+function sendError(packet, errorCode, message) {
+    console.log(`Rejecting request ${packet.requestId}: ${message}`);
+
+    io.to(packet.senderId).emit("packet_response", {
+        senderId: packet.senderId,
+        requestId: packet.requestId,
+        status: "FAILURE",
+        errorCode: errorCode,
+        message: message,
+    });
+}
+
+function getErrorMessage(errorCode, application) {
+    switch (errorCode) {
+        case NO_HOST:
+            return `No ${application} instance is connected to the proxy. Make sure that ${application} is running and that the MCP Plugin is connected.`;
+        case HOST_BUSY:
+            return `${application} already has ${MAX_QUEUED} commands waiting to run. Wait for them to finish and try again.`;
+        case HOST_STALE:
+            return `${application} has stopped responding to the proxy. It may be busy with a long running task or hung.`;
+        default:
+            return `Could not send command to ${application}`;
+    }
+}
+
+function completeRequest(requestId) {
+    const request = pendingRequests.get(requestId);
+    if (!request) {
+        return;
+    }
+
+    pendingRequests.delete(requestId);
+
+    const application = io.sockets.sockets.get(request.socketId)?.data
+        .application;
+    const instance = applicationClients[application]?.get(request.socketId);
+    if (instance && instance.inFlight > 0) {
+        instance.inFlight--;
+    }
+
+    if (instance) {
+        sendQueued(instance);
+    }
+}
+
 // Example: Use this function elsewhere in your code
 // sendToApplication('photoshop', { message: 'Update available' });
 
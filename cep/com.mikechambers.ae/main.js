@@ -6,6 +6,10 @@ const csInterface = new CSInterface();
 const APPLICATION = "aftereffects";
 const PROXY_URL = "http://localhost:3001";
 
+// Lets the proxy tell this After Effects apart from others that are connected
+const INSTANCE_ID = `${APPLICATION}-${Date.now().toString(36)}-${Math.random()
+    .toString(36)
+    .slice(2, 8)}`;
 
 let socket = null;
 
@@ -40,8 +44,15 @@ async function onCommandPacket(packet) {
 
     let out = {
         senderId: packet.senderId,
+        requestId: packet.requestId,
+        instanceId: INSTANCE_ID,
     };
 
+    if (isExpired(packet.command)) {
+        log(`Skipped expired command: ${packet.command.action}`);
+        return createExpiredResponse(out, packet.command);
+    }
+
     try {
         // Execute the command in After Effects (from commands.js)
         //const response = await executeCommand(packet.command);
@@ -74,7 +85,12 @@ function connectToServer() {
     socket.on("connect", () => {
         updateStatus(true);
         log(`Connected with ID: ${socket.id}`);
-        socket.emit("register", { application: APPLICATION });
+        // No heartbeat: the panel runs apart from After Effects's scripting
+        // engine, so it would keep beating while After Effects is hung
+        socket.emit("register", {
+            application: APPLICATION,
+            instanceId: INSTANCE_ID,
+        });
     });
 
     socket.on("command_packet", async (packet) => {
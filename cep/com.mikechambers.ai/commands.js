@@ -319,6 +319,19 @@ const parseAndRouteCommand = async (command) => {
     return await f(command);
 };
 
+// Commands carry a deadline, in milliseconds since the epoch. Once it has
+// passed the sender is no longer waiting, so the command is not run.
+function isExpired(command) {
+    return command.deadline !== undefined && Date.now() > command.deadline;
+}
+
+function createExpiredResponse(out, command) {
+    out.status = "FAILURE";
+    out.errorCode = "DEADLINE_EXCEEDED";
+    out.message = `${command.action} was not run because its deadline passed ${Date.now() - command.deadline} ms ago`;
+    return out;
+}
+
 
 // Execute commands
 /*
@@ -0,0 +1,139 @@
+# MIT License
+#
+# Copyright (c) 2025 Mike Chambers
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Single MCP server for several Adobe applications.
+
+Loads the per application servers (ps-mcp.py, pr-mcp.py, ...) into one
+process and exposes their tools with an application prefix, for example
+ps_get_layers and pr_get_project_info. All applications share one
+connection to the proxy, the font index and the cached application state,
+so running one process for five applications costs far less memory and
+startup time than running five.
+
+Set ADB_MCP_APPS to a comma separated list of the applications to expose.
+Defaults to all of them:
+
+    ps    Photoshop
+    pr    Premiere Pro
+    ai    Illustrator
+    ae    After Effects
+    id    InDesign
+    psbp  Photoshop batchPlay (ps-batch-play.py)
+"""
+
+from mcp.server.fastmcp import FastMCP
+import importlib.util
+import logger
+import sys
+import os
+
+# prefix -> server script
+APP_SERVERS = {
+    "ps": "ps-mcp.py",
+    "pr": "pr-mcp.py",
+    "ai": "ai-mcp.py",
+    "ae": "ae-mcp.py",
+    "id": "id-mcp.py",
+    "psbp": "ps-batch-play.py",
+}
+
+DEFAULT_APPS = "ps,pr,ai,ae,id"
+
+mcp_name = "Adobe MCP Server"
+print(f"{mcp_name} running on stdio", file=sys.stderr)
+
+def load_server(prefix:str):
+    """
+    Loads an application server script as a module.
+
+    Args:
+        prefix (str): Key of the server in APP_SERVERS
+
+    Returns:
+        module: The loaded server module
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), APP_SERVERS[prefix])
+
+    spec = importlib.util.spec_from_file_location(f"adb_mcp_{prefix}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+def prefixed_tools(prefix:str, server:FastMCP) -> list:
+    """
+    Returns the tools of an application server with the application prefix
+    added to their names.
+
+    The tools were already built when the application server registered
+    them, so they are copied under the new name instead of being built
+    again, which takes far longer.
+
+    Args:
+        prefix (str): Prefix for the tool names, for example "ps"
+        server (FastMCP): The application server
+    """
+
+    # lets tools that look up other tools by name, such as run_batch and
+    # submit_job, accept the prefixed names
+    server.tool_prefix = prefix
+
+    return [
+        tool.model_copy(update={"name": f"{prefix}_{tool.name}"})
+        for tool in server._tool_manager.list_tools()
+    ]
+
+def mount_resources(prefix:str, server:FastMCP):
+    """
+    Adds the resources of an application server to this server, with the
+    application prefix added to their names and URIs.
+
+    Args:
+        prefix (str): Prefix for the resource names, for example "ps"
+        server (FastMCP): The application server
+    """
+    for resource in server._resource_manager.list_resources():
+        uri = str(resource.uri).replace("://", f"://{prefix}/", 1)
+        mcp.add_resource(resource.model_copy(update={
+            "uri": uri,
+            "name": f"{prefix}_{resource.name}"
+        }))
+
+apps = os.environ.get("ADB_MCP_APPS", DEFAULT_APPS)
+
+servers = {}
+for prefix in [a.strip() for a in apps.split(",") if a.strip()]:
+    if prefix not in APP_SERVERS:
+        logger.log(f"Unknown application in ADB_MCP_APPS: {prefix}. Valid values are {', '.join(APP_SERVERS)}")
+        continue
+
+    servers[prefix] = load_server(prefix).mcp
+
+mcp = FastMCP(
+    mcp_name,
+    log_level="ERROR",
+    tools=[tool for prefix, server in servers.items() for tool in prefixed_tools(prefix, server)]
+)
+
+for prefix, server in servers.items():
+    mount_resources(prefix, server)
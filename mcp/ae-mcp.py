@@ -21,7 +21,7 @@
 # SOFTWARE.
 
 from mcp.server.fastmcp import FastMCP
-from core import init, sendCommand, createCommand
+from core import get_client
 import socket_client
 import sys
 
@@ -40,10 +40,14 @@ socket_client.configure(
     timeout=PROXY_TIMEOUT
 )
 
-init(APPLICATION, socket_client)
+# Commands go through the client for this application, which shares the
+# proxy connection and cached state with any other server in this process
+client = get_client(APPLICATION, socket_client)
+createCommand = client.createCommand
+sendCommand = client.sendCommand
 
 @mcp.tool()
-def execute_extend_script(script_string: str):
+async def execute_extend_script(script_string: str):
     """
     Executes arbitrary ExtendScript code in AfterEffects and returns the result.
 
@@ -74,7 +78,7 @@ def execute_extend_script(script_string: str):
     command = createCommand("executeExtendScript", {
         "scriptString": script_string
     })
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.resource("config://get_instructions")
 def get_instructions() -> str:
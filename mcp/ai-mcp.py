@@ -21,7 +21,7 @@
 # SOFTWARE.
 
 from mcp.server.fastmcp import FastMCP
-from core import init, sendCommand, createCommand
+from core import get_client
 import socket_client
 import sys
 
@@ -40,28 +40,32 @@ socket_client.configure(
     timeout=PROXY_TIMEOUT
 )
 
-init(APPLICATION, socket_client)
+# Commands go through the client for this application, which shares the
+# proxy connection and cached state with any other server in this process
+client = get_client(APPLICATION, socket_client)
+createCommand = client.createCommand
+sendCommand = client.sendCommand
 
 @mcp.tool()
-def get_documents():
+async def get_documents():
     """
     Returns information about all currently open documents in Illustrator.
 
     """
     command = createCommand("getDocuments", {})
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def get_active_document_info():
+async def get_active_document_info():
     """
     Returns information about the current active document.
 
     """
     command = createCommand("getActiveDocumentInfo", {})
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def open_file(
+async def open_file(
     path: str
 ):
     """
@@ -83,10 +87,10 @@ def open_file(
     }
     
     command = createCommand("openFile", command_params)
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def export_png(
+async def export_png(
     path: str,
     transparency: bool = True,
     anti_aliasing: bool = True,
@@ -172,12 +176,12 @@ def export_png(
         command_params["matteColor"] = matte_color
 
     command = createCommand("exportPNG", command_params)
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 @mcp.tool()
-def execute_extend_script(script_string: str):
+async def execute_extend_script(script_string: str):
     """
     Executes arbitrary ExtendScript code in Illustrator and returns the result.
     
@@ -207,7 +211,7 @@ def execute_extend_script(script_string: str):
     command = createCommand("executeExtendScript", {
         "scriptString": script_string
     })
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.resource("config://get_instructions")
 def get_instructions() -> str:
@@ -1,26 +1,351 @@
 import logger
+import uuid
+import time
+import contextvars
+import latency
+from state_cache import LayerTreeCache, SequenceCache, PreviewCache
 
-application = None
-socket_client = None
+# When set, sendCommand adds commands to this list instead of sending them.
+# See AppClient.captureCommands.
+_captured_commands = contextvars.ContextVar("captured_commands", default=None)
 
-def init(app, socket):
-    global application, socket_client
-    application = app
-    socket_client = socket
+class AppClient:
+    """
+    Sends commands to one application and keeps the state cached from its
+    replies.
 
+    All clients send over the one proxy connection in socket_client, so any
+    number of applications can be served from a single process. Use
+    get_client() so that servers for the same application share a client,
+    and with it the cached layer tree, sequences and previews.
+    """
 
-def createCommand(action:str, options:dict) -> str:
-    command = {
-        "application":application,
-        "action":action,
-        "options":options
-    }
+    def __init__(self, application, socket_client):
+        self.application = application
+        self.socket_client = socket_client
 
-    return command
+        # Photoshop layer tree and Premiere sequences, built from the deltas
+        # attached to replies
+        self.layer_tree = LayerTreeCache()
+        self.sequence_cache = SequenceCache()
 
-def sendCommand(command:dict):
+        # Photoshop preview images, keyed by the pixel revision the plugin
+        # reports
+        self.preview_cache = PreviewCache()
 
-    response = socket_client.send_message_blocking(command)
-    
-    logger.log(f"Final response: {response['status']}")
-    return response
\ No newline at end of file
+        # When more than one instance of the application is connected, the
+        # proxy sends every command with the same routing key to the same
+        # instance. Commands are keyed by the document the cached state above
+        # came from, so they go to the instance that has it. Set routing_key
+        # to key every command the same, or instance_id to send commands to
+        # one instance in particular.
+        self.routing_key = None
+        self.instance_id = None
+
+        # key used until a reply has said which document is open
+        self._session_key = uuid.uuid4().hex
+
+        # instance that answered the last command
+        self._last_instance_id = None
+
+        # requestId -> (action, start time, deadline) of each command
+        # waiting for a reply, in time.monotonic() seconds. The application
+        # runs commands one at a time, so a new command also waits for these.
+        self._in_flight = {}
+
+        # response times of each action, which the command timeouts are
+        # based on
+        self.latency = latency.get_stats()
+
+    def createCommand(self, action:str, options:dict, include:list = None,
+            timeout:float = None) -> dict:
+        """
+        Creates a command to send to the application.
+
+        The command carries a deadline, in milliseconds since the epoch, after
+        which the client stops waiting for it. The proxy and the plugin drop
+        the command instead of running it if it reaches them after that.
+
+        Args:
+            action (str): The action to run in the plugin
+            options (dict): Options for the action
+            include (list): Application state to attach to the reply, for
+                example ["document", "layers"]. Nothing is attached by default.
+            timeout (float): Seconds to wait for the response. Defaults to a
+                timeout based on how long the action has taken before. See
+                timeoutFor.
+        """
+        command = {
+            "application":self.application,
+            "action":action,
+            "options":options,
+            "include":include or [],
+            "requestId":uuid.uuid4().hex
+        }
+
+        timeout = timeout or self.timeoutFor(action)
+        if timeout:
+            command["deadline"] = int((time.time() + timeout) * 1000)
+
+        return command
+
+    def timeoutFor(self, action:str) -> float:
+        """
+        Returns the timeout for an action, based on its recent response
+        times, or the timeout the socket client was configured with if the
+        action has little history. Overrides set with the ADB_MCP_TIMEOUTS
+        environment variable or self.latency.set_override win.
+
+        Args:
+            action (str): The action, for example "getDocuments"
+
+        Returns:
+            float: Timeout in seconds, or None if the socket client is not
+                configured
+        """
+        default = self.socket_client.proxy_timeout
+        if not default:
+            return None
+
+        return self.latency.timeout(self.application, action, default)
+
+    async def sendCommand(self, command:dict):
+
+        captured = _captured_commands.get()
+        if captured is not None:
+            captured.append(command)
+            return {"status": "QUEUED", "requestId": command["requestId"]}
+
+        # Let the plugin send only what changed since the state we already have
+        if "layers" in command.get("include", []):
+            command["layersBase"] = self.layer_tree.base()
+
+        if self.sequence_cache.base():
+            command["sequencesBase"] = self.sequence_cache.base()
+
+        # A command can set its own routingKey, or None to go to the least
+        # busy instance
+        if "routingKey" not in command:
+            command["routingKey"] = self.routing_key or self._document_key()
+
+        if command["routingKey"] and self._last_instance_id:
+            command.setdefault("preferInstanceId", self._last_instance_id)
+
+        if self.instance_id:
+            command.setdefault("instanceId", self.instance_id)
+
+        # Give the command the time the commands ahead of it are still
+        # expected to hold the application, so a quick command sent while a
+        # long one runs does not time out in the queue
+        queued = self._expected_wait()
+        if queued and "deadline" in command:
+            command["deadline"] += int(queued * 1000)
+
+        # Only time commands that ran alone, so the wait behind other
+        # commands does not end up in the action's response times
+        alone = not self._in_flight
+
+        start = time.monotonic()
+        deadline = None
+        if "deadline" in command:
+            deadline = start + command["deadline"] / 1000 - time.time()
+        self._in_flight[command["requestId"]] = (command["action"], start, deadline)
+        try:
+            response = await self.socket_client.send_message(command)
+        except Exception as e:
+            if isinstance(e, self.socket_client.CommandTimeoutError) and alone:
+                self.latency.record_timeout(self.application, command["action"], time.monotonic() - start)
+
+            # A command that failed or timed out may still have changed
+            # pixels, so previews are no longer known to be current
+            self.preview_cache.update_revision(None)
+            raise
+        finally:
+            self._in_flight.pop(command["requestId"], None)
+
+        if response and response.get("status") == "SUCCESS" and alone:
+            self.latency.record(self.application, command["action"], time.monotonic() - start)
+
+        if response:
+            self._check_instance(response.get("instanceId"))
+
+        if response and "layersDelta" in response:
+            self.layer_tree.apply(response.pop("layersDelta"))
+            response["layers"] = self.layer_tree.to_tree()
+
+        if response and "sequencesDelta" in response:
+            self.sequence_cache.apply(response.pop("sequencesDelta"))
+            response["sequences"] = self.sequence_cache.sequences()
+            response["project"] = self.sequence_cache.project
+
+        if response and "pixelRevision" in response:
+            self.preview_cache.update_revision(response.pop("pixelRevision"))
+        
+        logger.log(f"Final response: {response['status']}")
+        return response
+
+    def _document_key(self) -> str:
+        """
+        Returns the routing key for the document or project the cached state
+        came from, or a key for this client if none is known yet. Document
+        ids are only unique within an instance, so the key includes the
+        instance that reported it.
+        """
+        document_id = self.layer_tree.document_id
+        if document_id is None and self.preview_cache.pixel_revision:
+            document_id = self.preview_cache.pixel_revision["documentId"]
+        if document_id is None:
+            document_id = self.sequence_cache.project_id
+
+        if document_id is None or self._last_instance_id is None:
+            return self._session_key
+
+        return f"{self._last_instance_id}:{document_id}"
+
+    def _expected_wait(self) -> float:
+        """
+        Returns how many seconds the commands in flight are still expected to
+        run, from the timeout of each one's action and how long it has been
+        running, but no longer than its deadline.
+        """
+        now = time.monotonic()
+        wait = 0
+        for action, start, deadline in self._in_flight.values():
+            end = start + (self.timeoutFor(action) or 0)
+            if deadline is not None:
+                end = min(end, deadline)
+            wait += max(0, end - now)
+
+        return min(wait, latency.MAX_TIMEOUT)
+
+    async def cancel(self, request_id:str) -> bool:
+        """
+        Asks the application to cancel a command sent with sendCommand. The
+        command's sendCommand call raises a CommandCancelledError if it was
+        stopped.
+
+        Args:
+            request_id (str): The requestId of the command
+
+        Returns:
+            bool: True if the command was found running
+        """
+        return await self.socket_client.cancel(request_id)
+
+    def _check_instance(self, instance_id):
+        # State cached from one instance says nothing about another, so
+        # start over if the reply came from a different instance
+        if not instance_id or instance_id == self._last_instance_id:
+            return
+
+        if self._last_instance_id is not None:
+            logger.log(f"Application instance changed to {instance_id}, clearing cached state")
+            self.layer_tree.clear()
+            self.sequence_cache.clear()
+            self.preview_cache.clear()
+
+        self._last_instance_id = instance_id
+
+    async def sendBatch(self, commands:list, stop_on_error:bool = True,
+            atomic:bool = False, history_name:str = None) -> dict:
+        """
+        Sends several commands to the application in one round trip. The
+        plugin runs them in order in a single modal scope, and attaches the
+        document state asked for by any of the commands once, after the last
+        one has run.
+
+        Atomic batches run as a single history state in Photoshop. If any
+        command fails, the document is rolled back to where it was before
+        the batch and an AppError is raised.
+
+        Args:
+            commands (list): Commands created with createCommand
+            stop_on_error (bool): Skip the remaining commands once one fails.
+                Always True for atomic batches.
+            atomic (bool): Roll back the whole batch if any command fails
+            history_name (str): Name of the history state for an atomic batch
+
+        Returns:
+            dict: The response. response["response"]["results"] has a
+                status, and a response or message, for each command.
+        """
+        include = []
+        for command in commands:
+            for item in command.get("include", []):
+                if item not in include:
+                    include.append(item)
+
+        options = {
+            "commands": commands,
+            "stopOnError": stop_on_error,
+            "atomic": atomic
+        }
+
+        if history_name:
+            options["historyName"] = history_name
+
+        # the batch gets as long as its commands would get between them
+        timeout = None
+        if self.timeoutFor("runBatch"):
+            timeout = min(
+                sum(self.timeoutFor(command["action"]) for command in commands),
+                latency.MAX_TIMEOUT
+            )
+
+        batch = self.createCommand("runBatch", options, include=include, timeout=timeout)
+
+        # a batch that does not update the cached state can run anywhere
+        if not include:
+            batch["routingKey"] = None
+
+        return await self.sendCommand(batch)
+
+    async def captureCommands(self, fn, *args, **kwargs) -> list:
+        """
+        Calls a function, such as an MCP tool, and returns the commands it
+        sends instead of sending them. sendCommand returns a QUEUED status
+        to the function for each one.
+
+        Returns:
+            list: The commands the function sent
+        """
+        captured = []
+        token = _captured_commands.set(captured)
+        try:
+            await fn(*args, **kwargs)
+        finally:
+            _captured_commands.reset(token)
+
+        return captured
+
+# application name -> AppClient
+_clients = {}
+
+def get_client(app, socket):
+    """
+    Returns the client for an application, creating it on first use.
+
+    Args:
+        app (str): The application name, for example "photoshop"
+        socket: The socket_client module used to send commands
+    """
+    if app not in _clients:
+        _clients[app] = AppClient(app, socket)
+
+    return _clients[app]
+
+def get_tool(server, name:str):
+    """
+    Returns a tool of an application server by name, or None. When the
+    server is mounted in adb-mcp.py, the name can also have the prefix its
+    tools are exposed with there, for example "ps_set_layer_visibility".
+
+    Args:
+        server (FastMCP): The application server
+        name (str): Name of the tool
+    """
+    prefix = getattr(server, "tool_prefix", None)
+    if prefix and name and name.startswith(f"{prefix}_"):
+        name = name[len(prefix) + 1:]
+
+    return server._tool_manager.get_tool(name)
@@ -22,8 +22,318 @@
 
 import os
 import sys
+import asyncio
 import glob
-from fontTools.ttLib import TTFont
+import mmap
+import time
+import struct
+import logger
+import bisect
+import threading
+import storage
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Fonts found on the system are cached in this file, keyed by path. A file is
+# only parsed again when its size or modification time changes.
+FONT_INDEX_FILE = "fonts.json"
+FONT_INDEX_VERSION = 1
+
+# name table IDs
+NAME_FAMILY = 1
+NAME_STYLE = 2
+NAME_POSTSCRIPT = 6
+NAME_TYPOGRAPHIC_FAMILY = 16
+NAME_TYPOGRAPHIC_STYLE = 17
+
+# Below this many files to parse, starting worker processes costs more than
+# it saves
+POOL_MIN_FILES = 64
+
+# Seconds between checks of the font directories for fonts that were added,
+# changed or removed while the server is running
+FONT_REFRESH_INTERVAL = 30
+
+class FontIndex:
+    """
+    In memory search index over a list of fonts.
+
+    Names are matched after lower casing and dropping anything that is not a
+    letter or digit, so "helvetica neue bold" matches HelveticaNeue-Bold.
+    Queries shorter than three characters are prefix searches over the
+    sorted names. Longer queries also match anywhere in the name, narrowed
+    down with a trigram index before checking each candidate.
+    """
+
+    def __init__(self, fonts, generation=0):
+        # bumped each time the fonts change, see get_font_generation()
+        self.generation = generation
+
+        # one entry per PostScript name, in the order they were found
+        unique = {}
+        for font in fonts:
+            unique.setdefault(font["postscriptName"], font)
+        self.fonts = list(unique.values())
+
+        self._keys = [_normalize_font_name(f["postscriptName"]) for f in self.fonts]
+        self._sorted = sorted((key, i) for i, key in enumerate(self._keys))
+
+        # ids from shortest to longest name, and each id's place in that order
+        self._ordered = sorted(range(len(self._keys)), key=lambda i: (len(self._keys[i]), self._keys[i]))
+        self._order = [0] * len(self._ordered)
+        for position, i in enumerate(self._ordered):
+            self._order[i] = position
+
+        self._trigrams = {}
+        self._families = {}
+        self._styles = {}
+
+        for i, font in enumerate(self.fonts):
+            key = self._keys[i]
+            for j in range(len(key) - 2):
+                self._trigrams.setdefault(key[j:j + 3], set()).add(i)
+
+            family = _normalize_font_name(font.get("family") or "")
+            self._families.setdefault(family, set()).add(i)
+
+            style = _normalize_font_name(font.get("style") or "")
+            self._styles.setdefault(style, set()).add(i)
+
+    def __len__(self):
+        return len(self.fonts)
+
+    def search(self, query=None, family=None, style=None, limit=20):
+        """
+        Searches the fonts by PostScript name, family and style.
+
+        Args:
+            query (str): Text to find in the PostScript name
+            family (str): Font family. Exact matches are used if there are
+                any, otherwise families containing the text.
+            style (str): Font style, for example Bold Italic. Matched the
+                same way as family.
+            limit (int): Max number of fonts to return
+
+        Returns:
+            list: Matching fonts, best matches first. Exact names come
+                first, then names starting with the query, then the rest.
+        """
+        filters = None
+
+        if family:
+            filters = self._lookup(self._families, family)
+
+        if style:
+            ids = self._lookup(self._styles, style)
+            filters = ids if filters is None else filters & ids
+
+        q = _normalize_font_name(query or "")
+
+        # names starting with the query come first, and the shortest of
+        # those is the exact match if there is one
+        results = []
+        if q:
+            prefixed = [i for i in self._prefix(q) if filters is None or i in filters]
+            results = sorted(prefixed, key=self._order.__getitem__)[:limit]
+
+            # short queries only match the start of names
+            if len(q) < 3:
+                return [self.fonts[i] for i in results]
+
+        # the smallest set of ids the rest of the matches must come from
+        pool = filters
+        if q:
+            trigram_pool = min(
+                (self._trigrams.get(q[j:j + 3], set()) for j in range(len(q) - 2)),
+                key=len
+            )
+            if pool is None or len(trigram_pool) < len(pool):
+                pool = trigram_pool
+
+        if pool is not None and len(pool) < len(self._ordered) // 8:
+            rest = sorted(pool, key=self._order.__getitem__)
+        else:
+            # with many possible matches, walking the names from shortest
+            # to longest finds enough of them long before reaching the end
+            rest = self._ordered
+
+        taken = set(results)
+        for i in rest:
+            if len(results) >= limit:
+                break
+
+            if i in taken or (filters is not None and i not in filters):
+                continue
+
+            if q in self._keys[i]:
+                results.append(i)
+
+        return [self.fonts[i] for i in results]
+
+    def _prefix(self, q):
+        ids = []
+        start = bisect.bisect_left(self._sorted, (q,))
+        for key, i in self._sorted[start:]:
+            if not key.startswith(q):
+                break
+            ids.append(i)
+        return ids
+
+    def _lookup(self, table, value):
+        value = _normalize_font_name(value)
+
+        if value in table:
+            return set(table[value])
+
+        ids = set()
+        for key, key_ids in table.items():
+            if value in key:
+                ids |= key_ids
+        return ids
+
+def _normalize_font_name(name):
+    return "".join(c for c in name.lower() if c.isalnum())
+
+# Fonts found by the background discovery started with start_font_discovery()
+_discovery_thread = None
+_discovery_done = threading.Event()
+_font_index = FontIndex([])
+
+def start_font_discovery():
+    """
+    Starts reading the installed fonts in a background thread, so servers
+    can finish starting up while the font index is updated. The thread then
+    keeps checking the font directories every FONT_REFRESH_INTERVAL seconds,
+    and updates the index when fonts are added, changed or removed. Does
+    nothing if discovery has already been started.
+    """
+    global _discovery_thread
+
+    if _discovery_thread is not None:
+        return
+
+    _discovery_thread = threading.Thread(target=_discover_fonts, name="font-discovery", daemon=True)
+    _discovery_thread.start()
+
+def get_font_index(timeout=None):
+    """
+    Returns the search index of the fonts found by the background discovery,
+    waiting for it to finish if needed. Starts discovery if it has not been
+    started.
+
+    Args:
+        timeout (float): Max seconds to wait. Waits until done if None.
+
+    Returns:
+        FontIndex: The font index. Empty if discovery did not finish within
+            timeout.
+    """
+    start_font_discovery()
+
+    if not _discovery_done.wait(timeout):
+        logger.log("Timed out waiting for font discovery")
+        return FontIndex([])
+
+    return _font_index
+
+def register_search_fonts(mcp):
+    """
+    Adds the search_fonts tool to a server.
+
+    Args:
+        mcp (FastMCP): The server to add the tool to
+    """
+
+    @mcp.tool()
+    async def search_fonts(query:str = None, family:str = None, style:str = None, limit:int = 20) -> list:
+        """
+        Searches the fonts installed on the system. Use this to find the PostScript name to pass when creating or editing text layers.
+
+        Args:
+            query (str): Text to search for in the PostScript name, for example "helvetica bold" or "Arial-BoldMT"
+            family (str): Font family to filter by, for example "Helvetica Neue"
+            style (str): Font style to filter by, for example "Bold Italic"
+            limit (int): Max number of fonts to return. Defaults to 20
+
+        Returns:
+            list: Matching fonts, best matches first. Each is a dict with postscriptName, family and style.
+        """
+
+        # waits for the background font discovery if it has not finished yet
+        index = await asyncio.to_thread(get_font_index)
+        return index.search(query, family, style, limit)
+
+def get_font_generation():
+    """
+    Returns the generation of the font index, which goes up each time the
+    installed fonts change. Anything built from the font list, such as
+    instruction text, is stale once the generation has changed.
+
+    Returns:
+        int: The generation. 0 until the first discovery has finished.
+    """
+    return _font_index.generation
+
+def _discover_fonts():
+    global _font_index
+
+    files = None
+    dir_mtimes = None
+    while True:
+        try:
+            # Adding, removing or replacing a font file changes the mtime
+            # of its directory, so the font files are only listed and
+            # checked again when a directory has changed
+            mtimes = _font_dir_mtimes()
+            if mtimes != dir_mtimes:
+                start = time.perf_counter()
+                files, changed = update_font_index(files)
+                dir_mtimes = mtimes
+
+                if changed or not _discovery_done.is_set():
+                    fonts = [face for entry in files.values() for face in entry["faces"]]
+                    _font_index = FontIndex(fonts, _font_index.generation + 1)
+
+                    logger.log(f"Found {len(_font_index)} fonts in {time.perf_counter() - start:.2f}s, "
+                        f"generation {_font_index.generation}")
+        except Exception as e:
+            logger.log(f"Error discovering fonts: {e}")
+        finally:
+            _discovery_done.set()
+
+        time.sleep(FONT_REFRESH_INTERVAL)
+
+def _font_dir_mtimes(font_dirs=None):
+    """
+    Returns the mtime of each font directory, and on macOS of the
+    directories under them too, since find_font_files searches those. A
+    font file rewritten in place does not change its directory's mtime, but
+    installers add, remove or rename files, which do.
+
+    Args:
+        font_dirs (list): Directories to check. Defaults to get_font_dirs()
+
+    Returns:
+        dict: Directory path -> mtime, or None if it does not exist
+    """
+    if font_dirs is None:
+        font_dirs = get_font_dirs()
+
+    mtimes = {}
+    dirs = list(font_dirs)
+
+    while dirs:
+        font_dir = dirs.pop()
+        try:
+            mtimes[font_dir] = os.stat(font_dir).st_mtime
+
+            if sys.platform == 'darwin':
+                with os.scandir(font_dir) as entries:
+                    dirs.extend(entry.path for entry in entries if entry.is_dir())
+        except OSError:
+            mtimes[font_dir] = None
+
+    return mtimes
 
 def list_all_fonts_postscript():
     """
@@ -33,15 +343,100 @@ def list_all_fonts_postscript():
     Returns:
         list: A list of PostScript font names as strings
     """
-    postscript_names = []
-    
-    # Get font directories based on platform
+    return list(set(font["postscriptName"] for font in list_all_fonts()))
+
+def list_all_fonts():
+    """
+    Returns info for all fonts installed on the system, from the on disk
+    font index. Only font files that are new or have changed since the index
+    was last saved are parsed.
+
+    Returns:
+        list: A list of dicts with postscriptName, family and style
+    """
+    files, _ = update_font_index()
+
+    fonts = []
+    for entry in files.values():
+        fonts.extend(entry["faces"])
+
+    return fonts
+
+def update_font_index(cached=None):
+    """
+    Brings the on disk font index up to date with the font files installed
+    on the system, and saves it if anything changed. Files are matched by
+    path, size and mtime, so only new or changed files are parsed.
+
+    Args:
+        cached (dict): The index from a previous call. Loaded from disk if
+            None.
+
+    Returns:
+        tuple: The index as a dict of font file path -> {size, mtime, faces},
+            and whether any fonts were added, changed or removed
+    """
+    if cached is None:
+        data = storage.load_json(FONT_INDEX_FILE, {})
+
+        cached = {}
+        if data.get("version") == FONT_INDEX_VERSION:
+            cached = data.get("files", {})
+
+    files = {}
+    to_parse = {}
+
+    for font_path in find_font_files():
+        try:
+            stat = os.stat(font_path)
+        except OSError:
+            continue
+
+        entry = cached.get(font_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            files[font_path] = entry
+            continue
+
+        to_parse[font_path] = stat
+
+    parsed = len(to_parse)
+    faces = _read_font_files(list(to_parse))
+
+    for font_path, stat in to_parse.items():
+        files[font_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "faces": faces[font_path]
+        }
+
+    # only write the index if fonts were added, changed or removed
+    changed = bool(parsed) or len(files) != len(cached)
+    if changed:
+        storage.save_json(FONT_INDEX_FILE, {
+            "version": FONT_INDEX_VERSION,
+            "files": files
+        })
+        logger.log(f"Font index updated: {parsed} files parsed, {len(files)} total")
+
+    return files, changed
+
+def get_font_dirs():
+    """
+    Returns the font directories for the current platform.
+
+    Returns:
+        list: Font directory paths. Empty on unsupported platforms.
+    """
     font_dirs = []
-    
+
     if sys.platform == 'win32':  # Windows
         # Windows font directory
         if 'WINDIR' in os.environ:
             font_dirs.append(os.path.join(os.environ['WINDIR'], 'Fonts'))
+
+        # Fonts installed for the current user only
+        if 'LOCALAPPDATA' in os.environ:
+            font_dirs.append(os.path.join(os.environ['LOCALAPPDATA'], 'Microsoft', 'Windows', 'Fonts'))
     
     elif sys.platform == 'darwin':  # macOS
         # macOS system font directories
@@ -52,10 +447,23 @@ def list_all_fonts_postscript():
         ])
     
     else:
-        print(f"Unsupported platform: {sys.platform}")
-        return []
-    
-    # Get all font files from all directories
+        logger.log(f"Unsupported platform for fonts: {sys.platform}")
+
+    return font_dirs
+
+def find_font_files(font_dirs=None):
+    """
+    Returns the paths of all font files in the font directories.
+
+    Args:
+        font_dirs (list): Directories to search. Defaults to get_font_dirs()
+
+    Returns:
+        list: Font file paths, without duplicates
+    """
+    if font_dirs is None:
+        font_dirs = get_font_dirs()
+
     font_extensions = ['*.ttf', '*.ttc', '*.otf']
     font_files = []
     
@@ -66,43 +474,271 @@ def list_all_fonts_postscript():
                 # Also check subdirectories on macOS
                 if sys.platform == 'darwin':
                     font_files.extend(glob.glob(os.path.join(font_dir, '**', ext), recursive=True))
-    
-    # Process each font file
-    for font_path in font_files:
-        try:
+
+    # the recursive glob also matches the top level files
+    return list(dict.fromkeys(font_files))
+
+def _read_font_files(font_paths, workers=None):
+    """
+    Reads the fonts in a list of font files, spreading the work across a
+    pool of processes when there are enough files to make it worthwhile.
+
+    Args:
+        font_paths (list): Paths to .ttf, .otf or .ttc files
+        workers (int): Max number of worker processes. Defaults to the
+            number of CPUs. Use 1 to read the files in this process.
+
+    Returns:
+        dict: Font file path -> list of fonts, as returned by _read_font_file
+    """
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(font_paths) // POOL_MIN_FILES + 1)
+
+    # a worker process must not start its own pool if it ends up importing a
+    # server script as its main module
+    if workers <= 1 or multiprocessing.parent_process() is not None:
+        return {font_path: _read_font_file(font_path) for font_path in font_paths}
+
+    # send the files in chunks so each worker gets a few batches
+    chunksize = max(1, len(font_paths) // (workers * 4))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_read_font_file, font_paths, chunksize=chunksize)
+            return dict(zip(font_paths, results))
+    except Exception as e:
+        # for example if the worker processes can't be started
+        logger.log(f"Could not scan fonts in worker processes, scanning serially: {e}")
+        return {font_path: _read_font_file(font_path) for font_path in font_paths}
+
+def _read_font_file(font_path):
+    """
+    Reads the fonts in a font file with the built in sfnt reader, falling
+    back to fontTools for files it can't parse.
+
+    Args:
+        font_path (str): Path to a .ttf, .otf or .ttc file
+
+    Returns:
+        list: A dict with postscriptName, family and style for each font in
+            the file. Fonts without a PostScript name are skipped.
+    """
+    try:
+        fonts = _read_sfnt_names(font_path)
+    except Exception as e:
+        logger.log(f"Could not read {font_path}, trying fontTools: {e}")
+        return _read_font_file_fonttools(font_path)
+
+    faces = []
+    for names in fonts:
+        ps_name = names.get(NAME_POSTSCRIPT)
+
+        # names starting with . are hidden system fonts
+        if ps_name and not ps_name.startswith('.'):
+            faces.append({
+                "postscriptName": ps_name,
+                "family": names.get(NAME_TYPOGRAPHIC_FAMILY) or names.get(NAME_FAMILY),
+                "style": names.get(NAME_TYPOGRAPHIC_STYLE) or names.get(NAME_STYLE)
+            })
+
+    return faces
+
+def _read_sfnt_names(font_path):
+    """
+    Reads the names of each font in a TrueType / OpenType file or collection
+    straight from the sfnt table directory and name table, without loading
+    the rest of the font. When the name table has no PostScript name, it is
+    read from the CFF table.
+
+    Args:
+        font_path (str): Path to a .ttf, .otf or .ttc file
+
+    Returns:
+        list: A dict of name ID -> name for each font in the file
+
+    Raises:
+        ValueError: If the file is not a valid sfnt file or collection
+    """
+    with open(font_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
             # TrueType Collections (.ttc files) can contain multiple fonts
-            if font_path.lower().endswith('.ttc'):
-                try:
-                    ttc = TTFont(font_path, fontNumber=0)
-                    num_fonts = ttc.reader.numFonts
-                    ttc.close()
-                    
-                    # Extract PostScript name from each font in the collection
-                    for i in range(num_fonts):
-                        try:
-                            font = TTFont(font_path, fontNumber=i)
-                            ps_name = _extract_postscript_name(font)
-                            if ps_name and not ps_name.startswith('.'):
-                                postscript_names.append(ps_name)
-                            font.close()
-                        except Exception as e:
-                            print(f"Error processing font {i} in collection {font_path}: {e}")
-                except Exception as e:
-                    print(f"Error determining number of fonts in collection {font_path}: {e}")
+            if data[:4] == b'ttcf':
+                num_fonts, = struct.unpack_from('>I', data, 8)
+                offsets = struct.unpack_from(f'>{num_fonts}I', data, 12)
             else:
-                # Regular TTF/OTF file
-                try:
-                    font = TTFont(font_path)
-                    ps_name = _extract_postscript_name(font)
+                offsets = [0]
+
+            fonts = []
+            for offset in offsets:
+                tables = _read_table_directory(data, offset)
+
+                if b'name' in tables:
+                    names = _read_name_table(data, *tables[b'name'])
+                else:
+                    names = {}
+
+                if NAME_POSTSCRIPT not in names and b'CFF ' in tables:
+                    ps_name = _read_cff_font_name(data, *tables[b'CFF '])
                     if ps_name:
-                        postscript_names.append(ps_name)
-                    font.close()
-                except Exception as e:
-                    print(f"Error processing font {font_path}: {e}")
-        except Exception as e:
-            print(f"Error with font file {font_path}: {e}")
- 
-    return list(set(postscript_names))
+                        names[NAME_POSTSCRIPT] = ps_name
+
+                fonts.append(names)
+
+            return fonts
+
+def _read_table_directory(data, offset):
+    """
+    Reads the sfnt table directory at offset.
+
+    Returns:
+        dict: Table tag -> (offset, length)
+    """
+    num_tables, = struct.unpack_from('>H', data, offset + 4)
+
+    tables = {}
+    for i in range(num_tables):
+        tag, _, table_offset, length = struct.unpack_from('>4sIII', data, offset + 12 + i * 16)
+
+        if table_offset + length > len(data):
+            raise ValueError(f"Table {tag} is outside the file")
+
+        tables[tag] = (table_offset, length)
+
+    return tables
+
+def _read_name_table(data, offset, length):
+    """
+    Reads the family, style and PostScript names from a name table,
+    preferring English Windows names, then Mac Roman names, then any other.
+
+    Returns:
+        dict: Name ID -> name
+    """
+    _, count, string_offset = struct.unpack_from('>HHH', data, offset)
+    strings = offset + string_offset
+
+    wanted = (
+        NAME_FAMILY,
+        NAME_STYLE,
+        NAME_POSTSCRIPT,
+        NAME_TYPOGRAPHIC_FAMILY,
+        NAME_TYPOGRAPHIC_STYLE
+    )
+
+    names = {}
+    best = {}
+    for i in range(count):
+        platform_id, encoding_id, language_id, name_id, name_length, name_offset = \
+            struct.unpack_from('>6H', data, offset + 6 + i * 12)
+
+        if name_id not in wanted:
+            continue
+
+        if platform_id == 3 and language_id == 0x409:
+            rank = 0
+        elif platform_id == 1 and encoding_id == 0 and language_id == 0:
+            rank = 1
+        else:
+            rank = 2
+
+        if name_id in best and best[name_id] <= rank:
+            continue
+
+        start = strings + name_offset
+        raw = data[start:start + name_length]
+
+        try:
+            if platform_id in (0, 3):
+                name = raw.decode('utf-16-be')
+            elif platform_id == 1:
+                name = raw.decode('mac_roman')
+            else:
+                name = raw.decode('latin-1')
+        except UnicodeDecodeError:
+            continue
+
+        if name:
+            names[name_id] = name
+            best[name_id] = rank
+
+    return names
+
+def _read_cff_font_name(data, offset, length):
+    """
+    Returns the first font name in the Name INDEX of a CFF table, or None.
+    """
+    header_size = data[offset + 2]
+    index = offset + header_size
+
+    count, = struct.unpack_from('>H', data, index)
+    if count == 0:
+        return None
+
+    off_size = data[index + 2]
+
+    def read_offset(i):
+        start = index + 3 + i * off_size
+        return int.from_bytes(data[start:start + off_size], 'big')
+
+    # offsets are 1 based, from the byte before the object data
+    data_start = index + 3 + (count + 1) * off_size - 1
+    start, end = read_offset(0), read_offset(1)
+
+    return data[data_start + start:data_start + end].decode('latin-1') or None
+
+def _read_font_file_fonttools(font_path):
+    """
+    Reads the fonts in a font file with fontTools, for files the built in
+    reader can't parse. Tables are loaded lazily so only the name table, and
+    the CFF table when the name table has no PostScript name, are parsed.
+
+    Args:
+        font_path (str): Path to a .ttf, .otf or .ttc file
+
+    Returns:
+        list: A dict with postscriptName, family and style for each font in
+            the file. Fonts without a PostScript name are skipped.
+    """
+    faces = []
+
+    try:
+        from fontTools.ttLib import TTFont, TTCollection
+    except ImportError:
+        logger.log(f"fontTools is not installed, skipping {font_path}")
+        return faces
+
+    try:
+        # TrueType Collections (.ttc files) can contain multiple fonts
+        if font_path.lower().endswith('.ttc'):
+            collection = TTCollection(font_path, lazy=True)
+            fonts = collection.fonts
+        else:
+            collection = TTFont(font_path, lazy=True)
+            fonts = [collection]
+    except Exception as e:
+        logger.log(f"Error opening font file {font_path}: {e}")
+        return faces
+
+    try:
+        for i, font in enumerate(fonts):
+            try:
+                ps_name = _extract_postscript_name(font)
+
+                # names starting with . are hidden system fonts
+                if ps_name and not ps_name.startswith('.'):
+                    family, style = _extract_family_and_style(font)
+                    faces.append({
+                        "postscriptName": ps_name,
+                        "family": family,
+                        "style": style
+                    })
+            except Exception as e:
+                logger.log(f"Error processing font {i} in {font_path}: {e}")
+    finally:
+        collection.close()
+
+    return faces
 
 def _extract_postscript_name(font):
     """
@@ -141,6 +777,84 @@ def _extract_postscript_name(font):
     
     return None
 
+def _extract_family_and_style(font):
+    """
+    Extract the family and style names from a TTFont object, preferring the
+    typographic names (nameID 16 / 17) over the legacy ones (nameID 1 / 2).
+
+    Args:
+        font: A TTFont object
+
+    Returns:
+        tuple: The family and style names, either of which may be None
+    """
+    if 'name' not in font:
+        return None, None
+
+    name_table = font['name']
+
+    family = name_table.getDebugName(16) or name_table.getDebugName(1)
+    style = name_table.getDebugName(17) or name_table.getDebugName(2)
+
+    return family, style
+
+def _benchmark(font_dirs=None):
+    """
+    Times a cold scan of the installed fonts, without the on disk index: the
+    original serial scan that opened every font in a collection as a new
+    TTFont, a lazy fontTools name table scan, the built in sfnt reader in
+    this process, and the same reader across a process pool.
+
+    Args:
+        font_dirs (list): Directories to scan. Defaults to get_font_dirs()
+    """
+    from fontTools.ttLib import TTFont
+
+    font_paths = find_font_files(font_dirs)
+
+    def original_scan():
+        names = []
+        for font_path in font_paths:
+            try:
+                num_fonts = 1
+                if font_path.lower().endswith('.ttc'):
+                    ttc = TTFont(font_path, fontNumber=0)
+                    num_fonts = ttc.reader.numFonts
+                    ttc.close()
+
+                for i in range(num_fonts):
+                    font = TTFont(font_path, fontNumber=i if num_fonts > 1 else -1)
+                    names.append(_extract_postscript_name(font))
+                    font.close()
+            except Exception:
+                pass
+        return names
+
+    def faces_found(results):
+        return sum(len(faces) for faces in results.values())
+
+    scans = [
+        ("original serial scan", lambda: len(original_scan())),
+        ("fontTools name table scan", lambda: sum(len(_read_font_file_fonttools(p)) for p in font_paths)),
+        ("sfnt reader, 1 process", lambda: faces_found(_read_font_files(font_paths, workers=1))),
+        (f"sfnt reader, {os.cpu_count()} processes", lambda: faces_found(_read_font_files(font_paths))),
+    ]
+
+    print(f"Scanning {len(font_paths)} font files")
+
+    baseline = None
+    for label, scan in scans:
+        start = time.perf_counter()
+        count = scan()
+        elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        print(f"{label:<32} {elapsed:8.3f}s  {count:6} fonts  {baseline / elapsed:5.1f}x")
+
 if __name__ == "__main__":
-    font_names = list_all_fonts_postscript()
-    print(f"Number of fonts found: {len(font_names)}")
\ No newline at end of file
+    # python fonts.py --benchmark [font dirs] times a cold scan
+    if "--benchmark" in sys.argv:
+        _benchmark([a for a in sys.argv[1:] if a != "--benchmark"] or None)
+    else:
+        font_names = list_all_fonts_postscript()
+        print(f"Number of fonts found: {len(font_names)}")
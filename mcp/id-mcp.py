@@ -21,7 +21,7 @@
 # SOFTWARE.
 
 from mcp.server.fastmcp import FastMCP
-from core import init, sendCommand, createCommand
+from core import get_client
 import socket_client
 import sys
 
@@ -46,10 +46,14 @@ socket_client.configure(
     timeout=PROXY_TIMEOUT
 )
 
-init(APPLICATION, socket_client)
+# Commands go through the client for this application, which shares the
+# proxy connection and cached state with any other server in this process
+client = get_client(APPLICATION, socket_client)
+createCommand = client.createCommand
+sendCommand = client.sendCommand
 
 @mcp.tool()
-def create_document(
+async def create_document(
    width: int, 
    height: int, 
    pages: int = 0,
@@ -90,7 +94,7 @@ def create_document(
        "pagesFacing": pages_facing
    })
    
-   return sendCommand(command)
+   return await sendCommand(command)
 
 @mcp.resource("config://get_instructions")
 def get_instructions() -> str:
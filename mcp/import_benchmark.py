@@ -0,0 +1,124 @@
+# MIT License
+#
+# Copyright (c) 2025 Mike Chambers
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Measures how long each MCP server takes to load, the way `mcp run` loads it,
+and fails if a server adds more than a budget on top of importing FastMCP
+itself. Every client launch starts these servers, so heavy dependencies
+should be imported the first time they are used, not at startup.
+
+Usage:
+    python import_benchmark.py [--budget SECONDS] [--runs N] [servers...]
+
+Exits with 1 if any server is over the budget.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+SERVERS = [
+    "ps-mcp.py",
+    "ps-batch-play.py",
+    "pr-mcp.py",
+    "id-mcp.py",
+    "ai-mcp.py",
+    "ae-mcp.py",
+]
+
+# max seconds a server may take to load, not counting FastMCP
+DEFAULT_BUDGET = 0.15
+
+# Loads a server in a fresh interpreter and prints how long importing
+# FastMCP and then running the server script took
+LOAD_SCRIPT = """
+import sys, time, json, importlib.util
+start = time.perf_counter()
+from mcp.server.fastmcp import FastMCP
+fastmcp = time.perf_counter() - start
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("server", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+server = time.perf_counter() - start
+heavy = [m for m in ("numpy", "PIL.Image", "fontTools.ttLib", "socketio", "aiohttp") if m in sys.modules]
+print(json.dumps({"fastmcp": fastmcp, "server": server, "heavy": heavy}))
+"""
+
+def time_server(server, runs):
+    """
+    Loads a server in a new process runs times.
+
+    Returns:
+        dict: The fastest fastmcp and server times, in seconds, and the heavy
+            modules that were imported at startup
+    """
+    mcp_dir = os.path.dirname(os.path.abspath(__file__))
+    best = None
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", LOAD_SCRIPT, os.path.join(mcp_dir, server)],
+            cwd=mcp_dir,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        timing = json.loads(result.stdout.strip().splitlines()[-1])
+
+        if best is None or timing["server"] < best["server"]:
+            best = timing
+
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks MCP server startup time against a budget")
+    parser.add_argument("servers", nargs="*", default=SERVERS)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+        help=f"max seconds a server may take to load, not counting FastMCP (default {DEFAULT_BUDGET})")
+    parser.add_argument("--runs", type=int, default=3,
+        help="number of times to load each server, the fastest is used (default 3)")
+    args = parser.parse_args()
+
+    failed = []
+
+    print(f"{'server':<20} {'fastmcp':>8} {'server':>8}  heavy imports at startup")
+    for server in args.servers:
+        timing = time_server(server, args.runs)
+
+        over = timing["server"] > args.budget
+        if over:
+            failed.append(server)
+
+        print(f"{server:<20} {timing['fastmcp']:7.3f}s {timing['server']:7.3f}s  "
+            f"{', '.join(timing['heavy']) or '-'}{'  OVER BUDGET' if over else ''}")
+
+    if failed:
+        print(f"\n{len(failed)} server(s) took longer than {args.budget}s to load: {', '.join(failed)}")
+        sys.exit(1)
+
+    print(f"\nAll servers loaded within {args.budget}s")
+
+if __name__ == "__main__":
+    main()
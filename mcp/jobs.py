@@ -0,0 +1,290 @@
+# MIT License
+#
+# Copyright (c) 2025 Mike Chambers
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from mcp.server.fastmcp import Context
+import logger
+from core import get_tool
+from socket_client import CommandCancelledError
+
+# Seconds a job's commands are allowed to run for. Jobs are for commands
+# that take longer than the proxy timeout, such as Firefly and exports.
+JOB_TIMEOUT = 600
+
+# Seconds between progress notifications while waiting for jobs
+PROGRESS_INTERVAL = 5
+
+# Finished jobs kept around so their results can still be collected
+MAX_FINISHED_JOBS = 100
+
+RUNNING = "RUNNING"
+SUCCESS = "SUCCESS"
+FAILURE = "FAILURE"
+CANCELLED = "CANCELLED"
+
+class Job:
+    """
+    Commands sent by one tool call, running in the background.
+    """
+
+    def __init__(self, tool, application):
+        self.id = uuid.uuid4().hex[:12]
+        self.tool = tool
+        self.application = application
+        self.status = RUNNING
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.task = None
+
+    @property
+    def done(self):
+        return self.status != RUNNING
+
+    def to_dict(self) -> dict:
+        """
+        Returns the job as a dict, with its result or error once finished.
+        """
+        end = self.finished or time.time()
+
+        out = {
+            "jobId": self.id,
+            "tool": self.tool,
+            "application": self.application,
+            "status": self.status,
+            "elapsed": round(end - self.submitted, 1)
+        }
+
+        if self.status == SUCCESS:
+            out["result"] = self.result
+        elif self.error:
+            out["error"] = self.error
+
+        return out
+
+# job id -> Job, oldest first. Shared by every server in the process, so
+# jobs for different applications can be waited on together.
+_jobs = OrderedDict()
+
+def submit(client, tool:str, commands:list, timeout:float = JOB_TIMEOUT) -> Job:
+    """
+    Starts sending commands in the background and returns right away.
+
+    Args:
+        client: The AppClient to send the commands with
+        tool (str): Name of the tool the commands came from
+        commands (list): Commands created with createCommand. They are sent
+            one after the other.
+        timeout (float): Seconds each command is allowed to run for
+
+    Returns:
+        Job: The running job
+    """
+    _prune()
+
+    job = Job(tool, client.application)
+    job.task = asyncio.get_running_loop().create_task(
+        _run(job, client, commands, timeout)
+    )
+    _jobs[job.id] = job
+
+    logger.log(f"Submitted job {job.id} for {tool}")
+    return job
+
+def get(job_id:str) -> Job:
+    """
+    Returns a job by id.
+
+    Raises:
+        ValueError: If there is no job with the id
+    """
+    job = _jobs.get(job_id)
+    if job is None:
+        raise ValueError(f"Unknown job id : {job_id}")
+
+    return job
+
+async def wait(job_ids:list, timeout:float, report_progress = None) -> list:
+    """
+    Waits until the jobs have finished or the timeout has passed.
+
+    Args:
+        job_ids (list): Ids of the jobs to wait for
+        timeout (float): Max seconds to wait. 0 returns the jobs' status
+            right away.
+        report_progress: Optional coroutine function called with the number
+            of finished jobs, the number of jobs and a message, every time a
+            job finishes and every PROGRESS_INTERVAL seconds in between
+
+    Returns:
+        list: Each job as a dict, in the order asked for. Finished jobs
+            include their result or error.
+    """
+    jobs = [get(job_id) for job_id in job_ids]
+    pending = {job.task for job in jobs if not job.done}
+
+    deadline = time.monotonic() + max(timeout, 0)
+
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        _, pending = await asyncio.wait(
+            pending,
+            timeout=min(remaining, PROGRESS_INTERVAL),
+            return_when=asyncio.FIRST_COMPLETED
+        )
+
+        if report_progress:
+            finished = [job for job in jobs if job.done]
+            running = ", ".join(
+                f"{job.tool} ({job.to_dict()['elapsed']}s)" for job in jobs if not job.done
+            )
+            message = f"{len(finished)} of {len(jobs)} jobs finished"
+            if running:
+                message += f". Running: {running}"
+
+            await report_progress(len(finished), len(jobs), message)
+
+    return [job.to_dict() for job in jobs]
+
+def cancel(job_id:str) -> bool:
+    """
+    Cancels a running job. The plugin is asked to stop the command it is
+    running, and the job's remaining commands are not sent.
+
+    Returns:
+        bool: False if the job had already finished
+    """
+    job = get(job_id)
+    if job.done:
+        return False
+
+    job.task.cancel()
+    return True
+
+# Tools added by register_tools
+JOB_TOOLS = ["submit_job", "wait_for_jobs", "cancel_job"]
+
+def register_tools(mcp, client, exclude:list, app_name:str, slow_tools:list):
+    """
+    Adds the submit_job, wait_for_jobs and cancel_job tools to an
+    application server.
+
+    Args:
+        mcp (FastMCP): The application server
+        client: The AppClient the server sends its commands with
+        exclude (list): Names of tools that can't be run as a job, such as
+            tools that return images. The job tools are always excluded.
+        app_name (str): Name of the application used in the tool
+            descriptions, for example "Photoshop"
+        slow_tools (list): Tools to suggest running as jobs
+    """
+    exclude = set(exclude) | set(JOB_TOOLS)
+
+    if len(slow_tools) > 1:
+        examples = ", ".join(slow_tools[:-1]) + f" and {slow_tools[-1]}"
+    else:
+        examples = slow_tools[0]
+
+    @mcp.tool(description=f"""
+    Starts a tool in the background and returns a job id right away, without waiting for {app_name} to finish. Use this for slow tools such as {examples}, so you can keep working, or start several at once, and collect the results later with wait_for_jobs.
+
+    Args:
+        tool (str): Name of the tool to run, for example "{slow_tools[0]}". The prefix the tools may be listed with is optional.
+        arguments (dict): The tool's arguments, as you would pass them to the tool
+
+    Returns:
+        dict: The job, with its jobId and status
+    """)
+    async def submit_job(tool:str, arguments:dict = None) -> dict:
+        t = get_tool(mcp, tool)
+
+        if not t or t.name in exclude:
+            raise ValueError(f"{tool} is not a tool that can be run as a job")
+
+        commands = await client.captureCommands(t.run, arguments or {})
+        return submit(client, tool, commands).to_dict()
+
+    @mcp.tool()
+    async def wait_for_jobs(job_ids:list[str], timeout:float = 30, ctx:Context = None) -> list:
+        """
+        Waits for jobs started with submit_job to finish, and returns their results. Returns early once all of the jobs have finished. Jobs still running when the timeout passes keep running, and can be waited on again.
+
+        Args:
+            job_ids (list[str]): Ids of the jobs to wait for
+            timeout (float): Max seconds to wait. Use 0 to check the status of the jobs without waiting. Defaults to 30
+
+        Returns:
+            list: Each job with its status (RUNNING, SUCCESS, FAILURE or CANCELLED), and its result or error once finished.
+        """
+
+        report_progress = ctx.report_progress if ctx else None
+        return await wait(job_ids, timeout, report_progress)
+
+    @mcp.tool(description=f"""
+    Cancels a job started with submit_job. {app_name} is asked to stop the command the job is running, and the job's remaining commands are not sent.
+
+    Args:
+        job_id (str): Id of the job to cancel
+
+    Returns:
+        bool: False if the job had already finished
+    """)
+    async def cancel_job(job_id:str) -> bool:
+        return cancel(job_id)
+
+async def _run(job, client, commands, timeout):
+    try:
+        responses = []
+        for command in commands:
+            # give the command the job's timeout rather than the one it was
+            # created with
+            command["deadline"] = int((time.time() + timeout) * 1000)
+
+            # a command that does not update the cached state can run on
+            # whichever instance is least busy
+            if not command.get("include"):
+                command.setdefault("routingKey", None)
+
+            responses.append(await client.sendCommand(command))
+
+        job.result = responses[0] if len(responses) == 1 else responses
+        job.status = SUCCESS
+    except (asyncio.CancelledError, CommandCancelledError):
+        job.status = CANCELLED
+    except Exception as e:
+        job.error = str(e)
+        job.status = FAILURE
+    finally:
+        job.finished = time.time()
+        logger.log(f"Job {job.id} for {job.tool} finished: {job.status}")
+
+def _prune():
+    finished = [job_id for job_id, job in _jobs.items() if job.done]
+    for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del _jobs[job_id]
@@ -0,0 +1,219 @@
+# MIT License
+#
+# Copyright (c) 2025 Mike Chambers
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import atexit
+import threading
+from collections import deque
+import logger
+import storage
+
+LATENCY_FILE = "latency.json"
+
+# Response times kept for each action
+MAX_SAMPLES = 100
+
+# Responses needed before an action's timeout is based on its own latency
+MIN_SAMPLES = 5
+
+# Timeouts are the 99th percentile response time times TIMEOUT_MULTIPLIER,
+# plus TIMEOUT_PADDING seconds, kept between MIN_TIMEOUT and MAX_TIMEOUT
+TIMEOUT_PERCENTILE = 99
+TIMEOUT_MULTIPLIER = 3
+TIMEOUT_PADDING = 0.5
+MIN_TIMEOUT = 1
+MAX_TIMEOUT = 600
+
+# Samples recorded between saves to disk. Stats are also saved on exit.
+SAVE_INTERVAL = 25
+
+# Timeout overrides in seconds, for example
+# ADB_MCP_TIMEOUTS="generative_fill=300,getDocuments=2"
+TIMEOUTS_ENV = "ADB_MCP_TIMEOUTS"
+
+class LatencyStats:
+    """
+    Rolling response times for each application action, used to give every
+    command a timeout that fits how long that action actually takes.
+
+    Quick actions such as getDocuments get timeouts of a second or two, so a
+    hung application is noticed right away, while slow ones such as
+    generativeFill get enough time to finish. Actions without enough
+    history use the default timeout, doubled each time they time out.
+
+    Stats are saved to the cache directory, so the timeouts carry over to
+    the next run.
+    """
+
+    def __init__(self, name=LATENCY_FILE):
+        self.name = name
+
+        # "application:action" -> deque of response times in seconds
+        self._samples = {}
+
+        # "application:action" -> min timeout after the action timed out
+        self._floors = {}
+
+        # normalized action or tool name -> timeout in seconds
+        self._overrides = {}
+
+        # keys recorded since the stats were loaded, so saving only writes
+        # what this process has measured
+        self._changed = set()
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        for key, samples in (storage.load_json(name, {}) or {}).items():
+            self._samples[key] = deque(samples, maxlen=MAX_SAMPLES)
+
+        self._overrides.update(_parse_overrides(os.environ.get(TIMEOUTS_ENV)))
+
+    def set_override(self, action:str, timeout:float):
+        """
+        Sets a fixed timeout for an action, ignoring its latency.
+
+        Args:
+            action (str): The action, for example "exportSequence", or the
+                tool that sends it, for example "export_sequence"
+            timeout (float): Timeout in seconds, or None to remove the override
+        """
+        key = _normalize(action)
+        if timeout is None:
+            self._overrides.pop(key, None)
+        else:
+            self._overrides[key] = timeout
+
+    def timeout(self, application:str, action:str, default:float) -> float:
+        """
+        Returns the timeout to use for a command.
+
+        Args:
+            application (str): The application the command is for
+            action (str): The command's action
+            default (float): Timeout for actions without enough history
+
+        Returns:
+            float: Timeout in seconds
+        """
+        override = self._overrides.get(_normalize(action))
+        if override:
+            return override
+
+        key = f"{application}:{action}"
+        samples = self._samples.get(key)
+
+        if samples and len(samples) >= MIN_SAMPLES:
+            timeout = self.percentile(application, action, TIMEOUT_PERCENTILE) * TIMEOUT_MULTIPLIER + TIMEOUT_PADDING
+        elif samples:
+            timeout = max(default, max(samples) * TIMEOUT_MULTIPLIER + TIMEOUT_PADDING)
+        else:
+            timeout = default
+
+        timeout = max(timeout, self._floors.get(key, 0))
+        return min(max(timeout, MIN_TIMEOUT), MAX_TIMEOUT)
+
+    def percentile(self, application:str, action:str, p:float) -> float:
+        """
+        Returns the pth percentile response time for an action in seconds,
+        or None if it has no history.
+        """
+        samples = self._samples.get(f"{application}:{action}")
+        if not samples:
+            return None
+
+        ordered = sorted(samples)
+        index = min(int(len(ordered) * p / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def record(self, application:str, action:str, seconds:float):
+        """
+        Records the response time of a command that succeeded.
+        """
+        key = f"{application}:{action}"
+
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=MAX_SAMPLES)).append(round(seconds, 3))
+            self._floors.pop(key, None)
+            self._changed.add(key)
+            self._unsaved += 1
+            save = self._unsaved >= SAVE_INTERVAL
+
+        if save:
+            self.save()
+
+    def record_timeout(self, application:str, action:str, timeout:float):
+        """
+        Records that a command timed out, so the next command for the action
+        gets twice as long.
+        """
+        key = f"{application}:{action}"
+        self._floors[key] = min(timeout * 2, MAX_TIMEOUT)
+        logger.log(f"{key} timed out after {timeout:.1f}s, next timeout is {self._floors[key]:.1f}s")
+
+    def save(self):
+        """
+        Saves the stats measured by this process, keeping the stats other
+        servers have saved for other actions.
+        """
+        with self._lock:
+            if not self._changed:
+                return
+
+            data = storage.load_json(self.name, {}) or {}
+            for key in self._changed:
+                data[key] = list(self._samples[key])
+
+            self._changed.clear()
+            self._unsaved = 0
+
+        storage.save_json(self.name, data)
+
+def _normalize(action):
+    # generative_fill and generativeFill are the same action
+    return action.replace("_", "").lower()
+
+def _parse_overrides(value):
+    overrides = {}
+    for item in (value or "").split(","):
+        name, _, seconds = item.partition("=")
+        if not name.strip():
+            continue
+
+        try:
+            overrides[_normalize(name.strip())] = float(seconds)
+        except ValueError:
+            logger.log(f"Ignoring invalid timeout override in {TIMEOUTS_ENV}: {item}")
+
+    return overrides
+
+# Shared by every client in the process, created on first use
+_stats = None
+
+def get_stats() -> LatencyStats:
+    """Returns the latency stats shared by every client in the process."""
+    global _stats
+
+    if _stats is None:
+        _stats = LatencyStats()
+        atexit.register(_stats.save)
+
+    return _stats
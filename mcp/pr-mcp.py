@@ -21,10 +21,9 @@
 # SOFTWARE.
 
 from mcp.server.fastmcp import FastMCP, Image
-from PIL import Image as PILImage
-
-from core import init, sendCommand, createCommand
+from core import get_client, get_tool
 import socket_client
+import jobs
 import sys
 import tempfile
 import os
@@ -51,10 +50,14 @@ socket_client.configure(
     timeout=PROXY_TIMEOUT
 )
 
-init(APPLICATION, socket_client)
+# Commands go through the client for this application, which shares the
+# proxy connection and cached state with any other server in this process
+client = get_client(APPLICATION, socket_client)
+createCommand = client.createCommand
+sendCommand = client.sendCommand
 
 @mcp.tool()
-def get_project_info():
+async def get_project_info():
     """
     Returns info on the currently active project in Premiere Pro.
     """
@@ -62,10 +65,10 @@ def get_project_info():
     command = createCommand("getProjectInfo", {
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def save_project():
+async def save_project():
     """
     Saves the active project in Premiere Pro.
     """
@@ -73,10 +76,10 @@ def save_project():
     command = createCommand("saveProject", {
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def save_project_as(file_path: str):
+async def save_project_as(file_path: str):
     """Saves the current Premiere project to the specified location.
     
     Args:
@@ -89,10 +92,10 @@ def save_project_as(file_path: str):
         "filePath":file_path
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def open_project(file_path: str):
+async def open_project(file_path: str):
     """Opens the Premiere project at the specified path.
     
     Args:
@@ -105,11 +108,11 @@ def open_project(file_path: str):
         "filePath":file_path
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def create_project(directory_path: str, project_name: str):
+async def create_project(directory_path: str, project_name: str):
     """
     Create a new Premiere project.
 
@@ -127,11 +130,11 @@ def create_project(directory_path: str, project_name: str):
         "name":project_name
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def create_bin_in_active_project(bin_name:str):
+async def create_bin_in_active_project(bin_name:str):
     """
     Creates a new bin / folder in the root project.
 
@@ -145,10 +148,10 @@ def create_bin_in_active_project(bin_name:str):
         "binName": bin_name
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def export_sequence(sequence_id: str, output_path: str, preset_path: str):
+async def export_sequence(sequence_id: str, output_path: str, preset_path: str):
     """
     Exports a Premiere Pro sequence to a video file using specified export settings.
 
@@ -173,10 +176,10 @@ def export_sequence(sequence_id: str, output_path: str, preset_path: str):
         "presetPath": preset_path
     })
     
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def move_project_items_to_bin(item_names: list[str], bin_name: str):
+async def move_project_items_to_bin(item_names: list[str], bin_name: str):
     """
     Moves specified project items to an existing bin/folder in the project.
 
@@ -203,10 +206,10 @@ def move_project_items_to_bin(item_names: list[str], bin_name: str):
         "binName": bin_name
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def set_audio_track_mute(sequence_id:str, audio_track_index: int, mute: bool):
+async def set_audio_track_mute(sequence_id:str, audio_track_index: int, mute: bool):
     """
     Sets the mute property on the specified audio track. If mute is true, all clips on the track will be muted and not played.
 
@@ -225,11 +228,11 @@ def set_audio_track_mute(sequence_id:str, audio_track_index: int, mute: bool):
         "mute":mute
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def set_active_sequence(sequence_id: str):
+async def set_active_sequence(sequence_id: str):
     """
     Sets the sequence with the specified id as the active sequence within Premiere Pro (currently selected and visible in timeline)
     
@@ -241,11 +244,11 @@ def set_active_sequence(sequence_id: str):
         "sequenceId":sequence_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def create_sequence_from_media(item_names: list[str], sequence_name: str = "default"):
+async def create_sequence_from_media(item_names: list[str], sequence_name: str = "default"):
     """
     Creates a new sequence from the specified project items, placing clips on the timeline in the order they are provided.
     
@@ -262,10 +265,10 @@ def create_sequence_from_media(item_names: list[str], sequence_name: str = "defa
         "sequenceName":sequence_name
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def close_gaps_on_sequence(sequence_id: str, track_index: int, track_type: str):
+async def close_gaps_on_sequence(sequence_id: str, track_index: int, track_type: str):
     """
     Closes gaps on the specified track(s) in a sequence's timeline.
 
@@ -292,11 +295,11 @@ def close_gaps_on_sequence(sequence_id: str, track_index: int, track_type: str):
         "trackType": track_type,
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def remove_item_from_sequence(sequence_id: str, track_index:int, track_item_index: int, track_type:str, ripple_delete:bool=True):
+async def remove_item_from_sequence(sequence_id: str, track_index:int, track_item_index: int, track_type:str, ripple_delete:bool=True):
     """
     Removes a specified media item from the sequence's timeline.
 
@@ -323,10 +326,10 @@ def remove_item_from_sequence(sequence_id: str, track_index:int, track_item_inde
         "rippleDelete":ripple_delete
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def add_marker_to_sequence(sequence_id: str, 
+async def add_marker_to_sequence(sequence_id: str, 
                            marker_name: str, 
                            start_time_ticks: int, 
                            duration_ticks: int, 
@@ -369,12 +372,12 @@ def add_marker_to_sequence(sequence_id: str,
         "markerType": marker_type
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 @mcp.tool()
-def add_media_to_sequence(sequence_id:str, item_name: str, video_track_index: int, audio_track_index: int, insertion_time_ticks: int = 0, overwrite: bool = True):
+async def add_media_to_sequence(sequence_id:str, item_name: str, video_track_index: int, audio_track_index: int, insertion_time_ticks: int = 0, overwrite: bool = True):
     """
     Adds a specified media item to the active sequence's timeline.
 
@@ -397,11 +400,11 @@ def add_media_to_sequence(sequence_id:str, item_name: str, video_track_index: in
         "overwrite":overwrite
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def set_clip_disabled(sequence_id:str, track_index: int, track_item_index: int, track_type:str, disabled: bool):
+async def set_clip_disabled(sequence_id:str, track_index: int, track_item_index: int, track_type:str, disabled: bool):
     """
     Enables or disables a clip in the timeline.
     
@@ -430,11 +433,11 @@ def set_clip_disabled(sequence_id:str, track_index: int, track_item_index: int,
         "disabled":disabled
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def set_clip_start_end_times(
+async def set_clip_start_end_times(
     sequence_id: str, track_index: int, track_item_index: int, start_time_ticks: int, 
         end_time_ticks: int, track_type: str):
     """
@@ -475,10 +478,10 @@ def set_clip_start_end_times(
         "trackType": track_type
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def add_black_and_white_effect(sequence_id:str, video_track_index: int, track_item_index: int):
+async def add_black_and_white_effect(sequence_id:str, video_track_index: int, track_item_index: int):
     """
     Adds a black and white effect to a clip at the specified track and position.
     
@@ -499,10 +502,10 @@ def add_black_and_white_effect(sequence_id:str, video_track_index: int, track_it
         ]
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def get_sequence_frame_image(sequence_id: str, seconds: int):
+async def get_sequence_frame_image(sequence_id: str, seconds: int):
     """Returns a jpeg of the specified timestamp in the specified sequence in Premiere pro as an MCP Image object that can be displayed."""
     
     temp_dir = tempfile.gettempdir()
@@ -514,12 +517,15 @@ def get_sequence_frame_image(sequence_id: str, seconds: int):
         "seconds": seconds
     })
     
-    result = sendCommand(command)
+    result = await sendCommand(command)
     
     if not result.get("status") == "SUCCESS":
         return result
     
     file_path = result["response"]["filePath"]
+
+    # Pillow is only loaded the first time a frame is requested
+    from PIL import Image as PILImage
     
     with open(file_path, 'rb') as f:
         png_image = PILImage.open(f)
@@ -547,7 +553,7 @@ def get_sequence_frame_image(sequence_id: str, seconds: int):
     return [result, image]
 
 @mcp.tool()
-def export_frame(sequence_id:str, file_path: str, seconds: int):
+async def export_frame(sequence_id:str, file_path: str, seconds: int):
     """Captures a specific frame from the sequence at the given timestamp
     and exports it as a PNG or JPG (depending on file extension) image file to the specified path.
     
@@ -567,11 +573,11 @@ def export_frame(sequence_id:str, file_path: str, seconds: int):
         }
     )
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def add_gaussian_blur_effect(sequence_id: str, video_track_index: int, track_item_index: int, blurriness: float, blur_dimensions: str = "HORIZONTAL_VERTICAL"):
+async def add_gaussian_blur_effect(sequence_id: str, video_track_index: int, track_item_index: int, blurriness: float, blur_dimensions: str = "HORIZONTAL_VERTICAL"):
     """
     Adds a gaussian blur effect to a clip at the specified track and position.
 
@@ -609,7 +615,7 @@ def add_gaussian_blur_effect(sequence_id: str, video_track_index: int, track_ite
         ]
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 def rgb_to_premiere_color3(rgb_color, alpha=1.0):
     """Converts RGB (0–255) dict to Premiere Pro color format [r, g, b, a] with floats (0.0–1.0)."""
@@ -642,7 +648,7 @@ def rgb_to_premiere_color(rgb_color, alpha=255):
 
 
 @mcp.tool()
-def add_tint_effect(sequence_id: str, video_track_index: int, track_item_index: int, black_map:dict = {"red":0, "green":0, "blue":0}, white_map:dict = {"red":255, "green":255, "blue":255}, amount:int = 100):
+async def add_tint_effect(sequence_id: str, video_track_index: int, track_item_index: int, black_map:dict = {"red":0, "green":0, "blue":0}, white_map:dict = {"red":255, "green":255, "blue":255}, amount:int = 100):
     """
     Adds the tint effect to a clip at the specified track and position.
     
@@ -679,12 +685,12 @@ def add_tint_effect(sequence_id: str, video_track_index: int, track_item_index:
         ]
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 @mcp.tool()
-def add_motion_blur_effect(sequence_id: str, video_track_index: int, track_item_index: int, direction: int, length: int):
+async def add_motion_blur_effect(sequence_id: str, video_track_index: int, track_item_index: int, direction: int, length: int):
     """
     Adds the directional blur effect to a clip at the specified track and position.
     
@@ -718,10 +724,10 @@ def add_motion_blur_effect(sequence_id: str, video_track_index: int, track_item_
         ]
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def append_video_transition(sequence_id: str, video_track_index: int, track_item_index: int, transition_name: str, duration: float = 1.0, clip_alignment: float = 0.5):
+async def append_video_transition(sequence_id: str, video_track_index: int, track_item_index: int, transition_name: str, duration: float = 1.0, clip_alignment: float = 0.5):
     """
     Creates a transition between the specified clip and the adjacent clip on the timeline.
     
@@ -778,11 +784,11 @@ def append_video_transition(sequence_id: str, video_track_index: int, track_item
         "duration":duration
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def set_video_clip_properties(sequence_id: str, video_track_index: int, track_item_index: int, opacity: int = 100, blend_mode: str = "NORMAL"):
+async def set_video_clip_properties(sequence_id: str, video_track_index: int, track_item_index: int, opacity: int = 100, blend_mode: str = "NORMAL"):
     """
     Sets opacity and blend mode properties for a video clip in the timeline.
 
@@ -812,10 +818,10 @@ def set_video_clip_properties(sequence_id: str, video_track_index: int, track_it
         "blendMode":blend_mode
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def import_media(file_paths:list):
+async def import_media(file_paths:list):
     """
     Imports a list of media files into the active Premiere project.
 
@@ -828,7 +834,14 @@ def import_media(file_paths:list):
         "filePaths":file_paths
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
+
+# Tools that don't just send commands, so can't be run as a job
+NON_JOB_TOOLS = [
+    "get_sequence_frame_image",
+]
+
+jobs.register_tools(mcp, client, NON_JOB_TOOLS, "Premiere", ["export_sequence"])
 
 @mcp.resource("config://get_instructions")
 def get_instructions() -> str:
@@ -844,6 +857,7 @@ def get_instructions() -> str:
     3. Read the info for the API calls to make sure you understand the requirements and arguments
     4. In general, add clips first, then effects, then transitions
     5. As a general rule keep transitions short (no more that 2 seconds is a good rule), and there should not be a gap between clips (or else the transition may not work)
+    6. Start exports with submit_job, keep working, and collect the results with wait_for_jobs
 
     IMPORTANT: To create a new project and add clips:
     1. Create new project (create_project)
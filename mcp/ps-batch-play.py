@@ -21,15 +21,12 @@
 # SOFTWARE.
 
 from mcp.server.fastmcp import FastMCP, Image
-from core import init, sendCommand, createCommand
-from fonts import list_all_fonts_postscript
-import numpy as np
-import base64
+from core import get_client
+from fonts import start_font_discovery, register_search_fonts
 import socket_client
 import sys
 import os
 
-FONT_LIMIT = 1000 #max number of font names to return to AI
 
 mcp_name = "Adobe Photoshop Batch Play MCP Server"
 mcp = FastMCP(mcp_name, log_level="ERROR")
@@ -45,10 +42,18 @@ socket_client.configure(
     timeout=PROXY_TIMEOUT
 )
 
-init(APPLICATION, socket_client)
+# Commands go through the client for this application, which shares the
+# proxy connection and cached state with any other server in this process
+client = get_client(APPLICATION, socket_client)
+createCommand = client.createCommand
+sendCommand = client.sendCommand
+
+# Fonts are read in the background so the server can answer the client
+# right away. search_fonts waits for them if they are not ready yet.
+start_font_discovery()
 
 @mcp.tool()
-def call_batch_play_command(commands: list):
+async def call_batch_play_command(commands: list):
     """
     Executes arbitrary Photoshop batchPlay commands via MCP.
 
@@ -91,11 +96,14 @@ def call_batch_play_command(commands: list):
         "executeBatchPlayCommand",
         {
             "commands": commands
-        }
+        },
+        include=["document", "layers", "selection"]
     )
 
-    return sendCommand(command)
+    return await sendCommand(command)
+
 
+register_search_fonts(mcp)
 
 @mcp.resource("config://get_instructions")
 def get_instructions() -> str:
@@ -151,10 +159,9 @@ def get_instructions() -> str:
 
     interpolation_methods: {", ".join(interpolation_methods)}
 
-    fonts: {", ".join(font_names[:FONT_LIMIT])}
+    fonts: Use search_fonts to find the PostScript name of a font
     """
 
-font_names = list_all_fonts_postscript()
 
 interpolation_methods = [
    "AUTOMATIC",
@@ -21,15 +21,14 @@
 # SOFTWARE.
 
 from mcp.server.fastmcp import FastMCP, Image
-from core import init, sendCommand, createCommand
-from fonts import list_all_fonts_postscript
-import numpy as np
-import base64
+from core import get_client, get_tool
+from fonts import start_font_discovery, register_search_fonts
 import socket_client
+import jobs
 import sys
 import os
+import io
 
-FONT_LIMIT = 1000 #max number of font names to return to AI
 
 #logger.log(f"Python path: {sys.executable}")
 #logger.log(f"PYTHONPATH: {os.environ.get('PYTHONPATH')}")
@@ -51,10 +50,19 @@ socket_client.configure(
     timeout=PROXY_TIMEOUT
 )
 
-init(APPLICATION, socket_client)
+# Commands go through the client for this application, which shares the
+# proxy connection and cached state with any other server in this process
+client = get_client(APPLICATION, socket_client)
+createCommand = client.createCommand
+sendCommand = client.sendCommand
+preview_cache = client.preview_cache
+
+# Fonts are read in the background so the server can answer the client
+# right away. search_fonts waits for them if they are not ready yet.
+start_font_discovery()
 
 @mcp.tool()
-def set_active_document(document_id:int):
+async def set_active_document(document_id:int):
     """
     Sets the document with the specified ID to the active document in Photoshop
 
@@ -64,12 +72,12 @@ def set_active_document(document_id:int):
 
     command = createCommand("setActiveDocument", {
         "documentId":document_id
-    })
+    }, include=["document", "layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def get_documents():
+async def get_documents():
     """
     Returns information on the documents currently open in Photoshop
     """
@@ -77,11 +85,11 @@ def get_documents():
     command = createCommand("getDocuments", {
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def create_gradient_layer_style(
+async def create_gradient_layer_style(
     layer_id: int,
     angle: int,
     type:str,
@@ -114,11 +122,11 @@ def create_gradient_layer_style(
         "opacityStops":opacity_stops
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def duplicate_document(document_name: str):
+async def duplicate_document(document_name: str):
     """Duplicates the current Photoshop Document into a new file
 
 
@@ -128,13 +136,13 @@ def duplicate_document(document_name: str):
     
     command = createCommand("duplicateDocument", {
         "name":document_name
-    })
+    }, include=["document", "layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def create_document(document_name: str, width: int, height:int, resolution:int, fill_color:dict = {"red":0, "green":0, "blue":0}, color_mode:str = "RGB"):
+async def create_document(document_name: str, width: int, height:int, resolution:int, fill_color:dict = {"red":0, "green":0, "blue":0}, color_mode:str = "RGB"):
     """Creates a new Photoshop Document
 
         Layer are created from bottom up based on the order they are created in, so create background elements first and then build on top.
@@ -157,12 +165,12 @@ def create_document(document_name: str, width: int, height:int, resolution:int,
         "resolution":resolution,
         "fillColor":fill_color,
         "colorMode":color_mode
-    })
+    }, include=["document", "layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def export_layers_as_png(layers_info: list[dict[str, str|int]]):
+async def export_layers_as_png(layers_info: list[dict[str, str|int]]):
     """Exports multiple layers from the Photoshop document as PNG files.
     
     This function exports each specified layer as a separate PNG image file to its 
@@ -182,12 +190,12 @@ def export_layers_as_png(layers_info: list[dict[str, str|int]]):
         "layersInfo":layers_info
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 @mcp.tool()
-def save_document_as(file_path: str, file_type: str = "PSD"):
+async def save_document_as(file_path: str, file_type: str = "PSD"):
     """Saves the current Photoshop document to the specified location and format.
     
     Args:
@@ -209,20 +217,20 @@ def save_document_as(file_path: str, file_type: str = "PSD"):
         "fileType":file_type
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def save_document():
+async def save_document():
     """Saves the current Photoshop Document
     """
     
     command = createCommand("saveDocument", {
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def group_layers(group_name: str, layer_ids: list[int]) -> list:
+async def group_layers(group_name: str, layer_ids: list[int]) -> list:
     """
     Creates a new layer group from the specified layers in Photoshop.
 
@@ -241,58 +249,146 @@ def group_layers(group_name: str, layer_ids: list[int]) -> list:
     command = createCommand("groupLayers", {
         "groupName":group_name,
         "layerIds":layer_ids
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
-@mcp.tool()
-def get_layer_image(layer_id: int):
-    """Returns a jpeg of the specified layer's content as an MCP Image object that can be displayed."""
+PREVIEW_FORMATS = ["jpeg", "png", "webp"]
+PREVIEW_QUALITY = 80 #default jpeg / webp quality for re-encoded previews
 
-    command = createCommand("getLayerImage",
-        {
-            "layerId":layer_id
-        }
-    )
+def _preview_image(image_bytes:bytes, max_edge:int, quality:int, format:str) -> Image:
+    """Returns the jpeg sent by the plugin as an MCP Image, downscaling and
+    re-encoding it with Pillow only when needed.
+
+    Args:
+        image_bytes (bytes): The jpeg data sent by the plugin
+        max_edge (int): Max size in pixels of the longest edge, or None
+        quality (int): Encoding quality (1 - 100) for jpeg and webp, or None
+        format (str): Image format to return. One of jpeg, png or webp
 
-    response = sendCommand(command)
+    Returns:
+        Image: The preview image
+    """
+    format = format.lower()
+    if format == "jpg":
+        format = "jpeg"
+
+    if format not in PREVIEW_FORMATS:
+        raise ValueError(f"Unsupported image format: {format}. Must be one of {PREVIEW_FORMATS}")
+
+    # Pillow is only loaded the first time an image is needed
+    from PIL import Image as PILImage
+
+    image = PILImage.open(io.BytesIO(image_bytes))
+
+    resized = False
+    if max_edge and max(image.size) > max_edge:
+        #the plugin normally scales the pixels itself, this catches older
+        #plugins and the rounding in getPixels targetSize
+        image.thumbnail((max_edge, max_edge), PILImage.LANCZOS)
+        resized = True
+
+    if not resized and format == "jpeg" and quality is None:
+        return Image(data=image_bytes, format="jpeg")
+
+    if format == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    save_options = {}
+    if format != "png":
+        save_options["quality"] = quality or PREVIEW_QUALITY
+
+    out = io.BytesIO()
+    image.save(out, format.upper(), **save_options)
+    return Image(data=out.getvalue(), format=format)
+
+async def _get_image_bytes(action:str, options:dict, layer_id:int, max_edge:int):
+    """Returns the jpeg for a document or layer image, from the preview cache
+    if no pixel changing command has run since it was taken.
+
+    Args:
+        action (str): getDocumentImage or getLayerImage
+        options (dict): Options for the command
+        layer_id (int): ID of the layer, or None for the whole document
+        max_edge (int): Max size in pixels of the longest edge
+
+    Returns:
+        tuple: The jpeg bytes, or None and the response from the plugin
+    """
+    jpeg_bytes = preview_cache.get(preview_cache.key(layer_id, max_edge))
+    if jpeg_bytes:
+        return jpeg_bytes, None
+
+    command = createCommand(action, options)
+    response = await sendCommand(command)
 
     if response.get('status') == 'SUCCESS' and 'response' in response:
-        image_data = response['response']
-        data_url = image_data.get('dataUrl')
+        # The plugin sends the encoded jpeg as a binary attachment
+        jpeg_bytes = response['response'].get('image')
+
+        if jpeg_bytes:
+            # keyed by the revision in this reply, which is the one the
+            # image was taken at
+            preview_cache.put(preview_cache.key(layer_id, max_edge), jpeg_bytes)
+            return jpeg_bytes, response
+
+    return None, response
+
+@mcp.tool()
+async def get_layer_image(layer_id: int, max_edge:int = 1024, quality:int = None, format:str = "jpeg"):
+    """Returns an image of the specified layer's content as an MCP Image object that can be displayed.
+
+    The image is a downscaled preview by default. Use a larger max_edge only when you need to check fine detail.
+
+    Args:
+        layer_id (int): ID of the layer to get the image for
+        max_edge (int): Max size in pixels of the longest edge of the image. Set to 0 for full resolution. Defaults to 1024
+        quality (int): Encoding quality (1 - 100) for jpeg and webp images. Defaults to 80
+        format (str): Image format. One of jpeg, png or webp. Defaults to jpeg
+    """
 
-        if data_url and data_url.startswith("data:image/jpeg;base64,"):
-            # Strip the data URL prefix and decode the base64 JPEG bytes
-            base64_data = data_url.split(",", 1)[1]
-            jpeg_bytes = base64.b64decode(base64_data)
+    jpeg_bytes, response = await _get_image_bytes("getLayerImage",
+        {
+            "layerId":layer_id,
+            "maxEdge":max_edge
+        },
+        layer_id,
+        max_edge
+    )
 
-            return Image(data=jpeg_bytes, format="jpeg")
+    if jpeg_bytes:
+        return _preview_image(jpeg_bytes, max_edge, quality, format)
 
     return response
 
 
 @mcp.tool()
-def get_document_image():
-    """Returns a jpeg of the current visible Photoshop document as an MCP Image object that can be displayed."""
-    command = createCommand("getDocumentImage", {})
-    response = sendCommand(command)
+async def get_document_image(max_edge:int = 1024, quality:int = None, format:str = "jpeg"):
+    """Returns an image of the current visible Photoshop document as an MCP Image object that can be displayed.
 
-    if response.get('status') == 'SUCCESS' and 'response' in response:
-        image_data = response['response']
-        data_url = image_data.get('dataUrl')
+    The image is a downscaled preview by default. Use a larger max_edge only when you need to check fine detail.
 
-        if data_url and data_url.startswith("data:image/jpeg;base64,"):
-            # Strip the data URL prefix and decode the base64 JPEG bytes
-            base64_data = data_url.split(",", 1)[1]
-            jpeg_bytes = base64.b64decode(base64_data)
+    Args:
+        max_edge (int): Max size in pixels of the longest edge of the image. Set to 0 for full resolution. Defaults to 1024
+        quality (int): Encoding quality (1 - 100) for jpeg and webp images. Defaults to 80
+        format (str): Image format. One of jpeg, png or webp. Defaults to jpeg
+    """
+    jpeg_bytes, response = await _get_image_bytes("getDocumentImage",
+        {
+            "maxEdge":max_edge
+        },
+        None,
+        max_edge
+    )
 
-            return Image(data=jpeg_bytes, format="jpeg")
+    if jpeg_bytes:
+        return _preview_image(jpeg_bytes, max_edge, quality, format)
 
     return response
 
 @mcp.tool()
-def save_document_image_as_png(file_path: str):
+async def save_document_image_as_png(file_path: str):
     """
     Capture the Photoshop document and save as PNG file
     
@@ -303,32 +399,22 @@ def save_document_image_as_png(file_path: str):
         dict: Status and file info
     """
     command = createCommand("getDocumentImage", {})
-    response = sendCommand(command)
-    
-    if response.get('format') == 'raw' and 'rawDataBase64' in response:
+    response = await sendCommand(command)
+
+    jpeg_bytes = response.get('response', {}).get('image')
+
+    if jpeg_bytes:
         try:
-            # Decode raw data
-            raw_bytes = base64.b64decode(response['rawDataBase64'])
-            
-            # Extract metadata
-            width = response['width']
-            height = response['height']
-            components = response['components']
-            
-            # Convert to numpy array and reshape
-            pixel_array = np.frombuffer(raw_bytes, dtype=np.uint8)
-            image_array = pixel_array.reshape((height, width, components))
-            
-            # Create and save PNG
-            mode = 'RGBA' if components == 4 else 'RGB'
-            image = Image.fromarray(image_array, mode)
+            from PIL import Image as PILImage
+
+            image = PILImage.open(io.BytesIO(jpeg_bytes))
             image.save(file_path, 'PNG')
             
             return {
                 'status': 'success',
                 'file_path': file_path,
-                'width': width,
-                'height': height,
+                'width': image.width,
+                'height': image.height,
                 'size_bytes': os.path.getsize(file_path)
             }
             
@@ -340,11 +426,11 @@ def save_document_image_as_png(file_path: str):
     else:
         return {
             'status': 'error',
-            'error': 'No raw image data received'
+            'error': 'No image data received'
         }
 
 @mcp.tool()
-def get_layers() -> list:
+async def get_layers() -> list:
     """Returns a nested list of dicts that contain layer info and the order they are arranged in.
 
     Args:
@@ -359,11 +445,11 @@ def get_layers() -> list:
 
     command = createCommand("getLayers", {})
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def place_image(
+async def place_image(
     layer_id: int,
     image_path: str
 ):
@@ -379,12 +465,12 @@ def place_image(
     command = createCommand("placeImage", {
         "layerId":layer_id,
         "imagePath":image_path
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def harmonize_layer(layer_id:int,  new_layer_name:str, rasterize_layer:bool = True):
+async def harmonize_layer(layer_id:int,  new_layer_name:str, rasterize_layer:bool = True):
     """Harmonizes (matches lighting and other settings) the selected layer with the background layers.
 
     The layer being harmonized should be rasterized and have some transparency.
@@ -401,13 +487,13 @@ def harmonize_layer(layer_id:int,  new_layer_name:str, rasterize_layer:bool = Tr
         "layerId":layer_id,
          "newLayerName":new_layer_name,
         "rasterizeLayer":rasterize_layer
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def rename_layers(
+async def rename_layers(
     layer_data: list[dict]
 ):
     """Renames one or more layers
@@ -423,11 +509,11 @@ def rename_layers(
         "layerData":layer_data
     })
     
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def scale_layer(
+async def scale_layer(
     layer_id:int,
     width:int,
     height:int,
@@ -452,11 +538,11 @@ def scale_layer(
         "interpolationMethod":interpolation_method
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def rotate_layer(
+async def rotate_layer(
     layer_id:int,
     angle:int,
     anchor_position:str,
@@ -478,11 +564,11 @@ def rotate_layer(
         "interpolationMethod":interpolation_method
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def flip_layer(
+async def flip_layer(
     layer_id:int,
     axis:str
 ):
@@ -498,11 +584,11 @@ def flip_layer(
         "axis":axis
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def delete_layer(
+async def delete_layer(
     layer_id:int
 ):
     """Deletes the layer with the specified ID
@@ -513,14 +599,14 @@ def delete_layer(
     
     command = createCommand("deleteLayer", {
         "layerId":layer_id
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 @mcp.tool()
-def set_layer_visibility(
+async def set_layer_visibility(
     layer_id:int,
     visible:bool
 ):
@@ -536,11 +622,11 @@ def set_layer_visibility(
         "visible":visible
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def generate_image(
+async def generate_image(
     layer_name:str,
     prompt:str,
     content_type:str = "none"
@@ -560,12 +646,12 @@ def generate_image(
         "layerName":layer_name,
         "prompt":prompt,
         "contentType":content_type
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def generative_fill(
+async def generative_fill(
     layer_name: str,
     prompt: str,
     layer_id: int,
@@ -593,13 +679,13 @@ def generative_fill(
         "prompt":prompt,
         "layerId":layer_id,
         "contentType":content_type,
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def move_layer(
+async def move_layer(
     layer_id:int,
     position:str
 ):
@@ -613,12 +699,12 @@ def move_layer(
     command = createCommand("moveLayer", {
         "layerId":layer_id,
         "position":position
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def get_document_info():
+async def get_document_info():
     """Retrieves information about the currently active document.
 
     Returns:
@@ -636,10 +722,10 @@ def get_document_info():
 
     command = createCommand("getDocumentInfo", {})
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def crop_document():
+async def crop_document():
     """Crops the document to the active selection.
 
     This function removes all content outside the selection area and resizes the document 
@@ -648,12 +734,12 @@ def crop_document():
     An active selection is required.
     """
 
-    command = createCommand("cropDocument", {})
+    command = createCommand("cropDocument", {}, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def paste_from_clipboard(layer_id: int, paste_in_place: bool = True):
+async def paste_from_clipboard(layer_id: int, paste_in_place: bool = True):
     """Pastes the current clipboard contents onto the specified layer.
 
     If `paste_in_place` is True, the content will be positioned exactly where it was cut or copied from.
@@ -669,12 +755,12 @@ def paste_from_clipboard(layer_id: int, paste_in_place: bool = True):
     command = createCommand("pasteFromClipboard", {
         "layerId":layer_id,
         "pasteInPlace":paste_in_place
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def rasterize_layer(layer_id: int):
+async def rasterize_layer(layer_id: int):
     """Converts the specified layer into a rasterized (flat) image.
 
     This process removes any vector, text, or smart object properties, turning the layer 
@@ -686,12 +772,12 @@ def rasterize_layer(layer_id: int):
 
     command = createCommand("rasterizeLayer", {
         "layerId":layer_id
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def open_photoshop_file(file_path: str):
+async def open_photoshop_file(file_path: str):
     """Opens the specified Photoshop-compatible file within Photoshop.
 
     This function attempts to open a file in Adobe Photoshop. The file must be in a 
@@ -709,12 +795,12 @@ def open_photoshop_file(file_path: str):
 
     command = createCommand("openFile", {
         "filePath":file_path
-    })
+    }, include=["document", "layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def cut_selection_to_clipboard(layer_id: int):
+async def cut_selection_to_clipboard(layer_id: int):
     """Copies and removes (cuts) the selected pixels from the specified layer to the system clipboard.
 
     This function requires an active selection.
@@ -727,11 +813,11 @@ def cut_selection_to_clipboard(layer_id: int):
         "layerId":layer_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def copy_merged_selection_to_clipboard():
+async def copy_merged_selection_to_clipboard():
     """Copies the selected pixels from all visible layers to the system clipboard.
 
     This function requires an active selection. If no selection is active, the operation will fail.
@@ -747,10 +833,10 @@ def copy_merged_selection_to_clipboard():
 
     command = createCommand("copyMergedSelectionToClipboard", {})
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def copy_selection_to_clipboard(layer_id: int):
+async def copy_selection_to_clipboard(layer_id: int):
     """Copies the selected pixels from the specified layer to the system clipboard.
 
     This function requires an active selection. If no selection is active, the operation will fail.
@@ -766,10 +852,10 @@ def copy_selection_to_clipboard(layer_id: int):
         "layerId":layer_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def select_subject(layer_id: int):
+async def select_subject(layer_id: int):
     """Automatically selects the subject in the specified layer.
 
     This function identifies and selects the subject in the given image layer. 
@@ -783,12 +869,12 @@ def select_subject(layer_id: int):
     
     command = createCommand("selectSubject", {
         "layerId":layer_id
-    })
+    }, include=["selection"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def select_sky(layer_id: int):
+async def select_sky(layer_id: int):
     """Automatically selects the sky in the specified layer.
 
     This function identifies and selects the sky in the given image layer. 
@@ -802,13 +888,13 @@ def select_sky(layer_id: int):
     
     command = createCommand("selectSky", {
         "layerId":layer_id
-    })
+    }, include=["selection"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def get_layer_bounds(
+async def get_layer_bounds(
     layer_id: int
 ):
     """Returns the pixel bounds for the layer with the specified ID
@@ -831,10 +917,10 @@ def get_layer_bounds(
         "layerId":layer_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def remove_background(
+async def remove_background(
     layer_id:int
 ):
     """Automatically removes the background of the image in the layer with the specified ID and keeps the main subject
@@ -847,10 +933,10 @@ def remove_background(
         "layerId":layer_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def create_pixel_layer(
+async def create_pixel_layer(
     layer_name:str,
     fill_neutral:bool,
     opacity:int = 100,
@@ -870,12 +956,12 @@ def create_pixel_layer(
         "opacity":opacity,
         "fillNeutral":fill_neutral,
         "blendMode":blend_mode
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def create_multi_line_text_layer(
+async def create_multi_line_text_layer(
     layer_name:str, 
     text:str, 
     font_size:int, 
@@ -895,7 +981,7 @@ def create_multi_line_text_layer(
         layer_name (str): The name of the layer to be created. Can be used to select in other api calls.
         text (str): The text to include on the layer.
         font_size (int): Font size.
-        postscript_font_name (string): Postscript Font Name to display the text in. Valid list available via get_option_info.
+        postscript_font_name (string): Postscript Font Name to display the text in. Use search_fonts to find valid names.
         opacity (int): Opacity for the layer specified in percent.
         blend_mode (str): Blend Mode for the layer. Valid list available via get_option_info
         text_color (dict): Color of the text expressed in Red, Green, Blue values between 0 and 255
@@ -915,13 +1001,13 @@ def create_multi_line_text_layer(
         "blendMode":blend_mode,
         "bounds":bounds,
         "justification":justification
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def create_single_line_text_layer(
+async def create_single_line_text_layer(
     layer_name:str, 
     text:str, 
     font_size:int, 
@@ -939,7 +1025,7 @@ def create_single_line_text_layer(
         layer_name (str): The name of the layer to be created. Can be used to select in other api calls.
         text (str): The text to include on the layer.
         font_size (int): Font size.
-        postscript_font_name (string): Postscript Font Name to display the text in. Valid list available via get_option_info.
+        postscript_font_name (string): Postscript Font Name to display the text in. Use search_fonts to find valid names.
         opacity (int): Opacity for the layer specified in percent.
         blend_mode (str): Blend Mode for the layer. Valid list available via get_option_info
         text_color (dict): Color of the text expressed in Red, Green, Blue values between 0 and 255
@@ -955,12 +1041,12 @@ def create_single_line_text_layer(
         "fontName":postscript_font_name,
         "textColor":text_color,
         "blendMode":blend_mode
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def edit_text_layer(
+async def edit_text_layer(
     layer_id:int, 
     text:str = None,
     font_size:int = None,
@@ -975,7 +1061,7 @@ def edit_text_layer(
         layer_id (int): The ID of the existing text layer to edit.
         text (str): The new text content to replace the current text in the layer. If None, text will not be changed.
         font_size (int): Font size. If None, size will not be changed.
-        postscript_font_name (string): Postscript Font Name to display the text in. Valid list available via get_option_info. If None, font will not will not be changed.
+        postscript_font_name (string): Postscript Font Name to display the text in. Use search_fonts to find valid names. If None, font will not will not be changed.
         text_color (dict): Color of the text expressed in Red, Green, Blue values between 0 and 255 in format of {"red":255, "green":255, "blue":255}. If None, color will not be changed
     """
 
@@ -987,12 +1073,12 @@ def edit_text_layer(
         "textColor":text_color
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 @mcp.tool()
-def translate_layer(
+async def translate_layer(
     layer_id: int,
     x_offset:int = 0,
     y_offset:int = 0
@@ -1013,10 +1099,10 @@ def translate_layer(
         "yOffset":y_offset
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def remove_layer_mask(
+async def remove_layer_mask(
     layer_id: int
     ):
 
@@ -1030,10 +1116,10 @@ def remove_layer_mask(
         "layerId":layer_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def add_layer_mask_from_selection(
+async def add_layer_mask_from_selection(
     layer_id: int
     ):
 
@@ -1051,10 +1137,10 @@ def add_layer_mask_from_selection(
         "layerId":layer_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def set_layer_properties(
+async def set_layer_properties(
     layer_id: int,
     blend_mode: str = "NORMAL",
     layer_opacity: int = 100,
@@ -1080,10 +1166,10 @@ def set_layer_properties(
         "isClippingMask":is_clipping_mask
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def fill_selection(
+async def fill_selection(
     layer_id: int,
     color:dict = {"red":255, "green":0, "blue":0},
     blend_mode:str = "NORMAL",
@@ -1106,12 +1192,12 @@ def fill_selection(
         "opacity":opacity
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 @mcp.tool()
-def delete_selection(
+async def delete_selection(
     layer_id: int
     ):
 
@@ -1125,20 +1211,20 @@ def delete_selection(
         "layerId":layer_id
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def invert_selection():
+async def invert_selection():
     
     """Inverts the current selection in the Photoshop document"""
 
-    command = createCommand("invertSelection", {})
-    return sendCommand(command)
+    command = createCommand("invertSelection", {}, include=["selection"])
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def clear_selection():
+async def clear_selection():
     
     """Clears / deselects the current selection"""
 
@@ -1146,12 +1232,12 @@ def clear_selection():
         "feather":0,
         "antiAlias":True,
         "bounds":{"top": 0, "left": 0, "bottom": 0, "right": 0}
-    })
+    }, include=["selection"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def select_rectangle(
+async def select_rectangle(
     layer_id:int,
     feather:int = 0,
     anti_alias:bool = True,
@@ -1172,12 +1258,12 @@ def select_rectangle(
         "feather":feather,
         "antiAlias":anti_alias,
         "bounds":bounds
-    })
+    }, include=["selection"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def select_polygon(
+async def select_polygon(
     layer_id:int,
     feather:int = 0,
     anti_alias:bool = True,
@@ -1198,12 +1284,12 @@ def select_polygon(
         "feather":feather,
         "antiAlias":anti_alias,
         "points":points
-    })
+    }, include=["selection"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def select_ellipse(
+async def select_ellipse(
     layer_id:int,
     feather:int = 0,
     anti_alias:bool = True,
@@ -1224,12 +1310,12 @@ def select_ellipse(
         "feather":feather,
         "antiAlias":anti_alias,
         "bounds":bounds
-    })
+    }, include=["selection"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def align_content(
+async def align_content(
     layer_id: int,
     alignment_mode:str
     ):
@@ -1247,10 +1333,10 @@ def align_content(
         "alignmentMode":alignment_mode
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def add_drop_shadow_layer_style(
+async def add_drop_shadow_layer_style(
     layer_id: int,
     blend_mode:str = "MULTIPLY",
     color:dict = {"red":0, "green":0, "blue":0},
@@ -1284,10 +1370,10 @@ def add_drop_shadow_layer_style(
         "size":size
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def duplicate_layer(layer_to_duplicate_id:int, duplicate_layer_name:str):
+async def duplicate_layer(layer_to_duplicate_id:int, duplicate_layer_name:str):
     """
     Duplicates the layer specified by layer_to_duplicate_id ID, creating a new layer above it with the name specified by duplicate_layer_name
 
@@ -1299,12 +1385,12 @@ def duplicate_layer(layer_to_duplicate_id:int, duplicate_layer_name:str):
     command = createCommand("duplicateLayer", {
         "sourceLayerId":layer_to_duplicate_id,
         "duplicateLayerName":duplicate_layer_name,
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def flatten_all_layers(layer_name:str):
+async def flatten_all_layers(layer_name:str):
     """
     Flatten all layers in the document into a single layer with specified name
 
@@ -1314,12 +1400,12 @@ def flatten_all_layers(layer_name:str):
 
     command = createCommand("flattenAllLayers", {
         "layerName":layer_name,
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def add_color_balance_adjustment_layer(
+async def add_color_balance_adjustment_layer(
     layer_id: int,
     highlights:list = [0,0,0],
     midtones:list = [0,0,0],
@@ -1345,12 +1431,12 @@ def add_color_balance_adjustment_layer(
         "highlights":highlights,
         "midtones":midtones,
         "shadows":shadows
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def add_brightness_contrast_adjustment_layer(
+async def add_brightness_contrast_adjustment_layer(
     layer_id: int,
     brightness:int = 0,
     contrast:int = 0):
@@ -1366,13 +1452,13 @@ def add_brightness_contrast_adjustment_layer(
         "layerId":layer_id,
         "brightness":brightness,
         "contrast":contrast
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def add_stroke_layer_style(
+async def add_stroke_layer_style(
     layer_id: int,
     size: int = 2,
     color: dict = {"red": 0, "green": 0, "blue": 0},
@@ -1401,11 +1487,11 @@ def add_stroke_layer_style(
         "blendMode":blend_mode
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 @mcp.tool()
-def add_vibrance_adjustment_layer(
+async def add_vibrance_adjustment_layer(
     layer_id: int,
     vibrance:int = 0,
     saturation:int = 0):
@@ -1422,12 +1508,12 @@ def add_vibrance_adjustment_layer(
         "layerId":layer_id,
         "saturation":saturation,
         "vibrance":vibrance
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def add_black_and_white_adjustment_layer(
+async def add_black_and_white_adjustment_layer(
     layer_id: int,
     colors: dict = {"blue": 20, "cyan": 60, "green": 40, "magenta": 80, "red": 40, "yellow": 60},
     tint: bool = False,
@@ -1453,12 +1539,12 @@ def add_black_and_white_adjustment_layer(
         "colors":colors,
         "tint":tint,
         "tintColor":tint_color
-    })
+    }, include=["layers"])
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 @mcp.tool()
-def apply_gaussian_blur(layer_id: int, radius: float = 2.5):
+async def apply_gaussian_blur(layer_id: int, radius: float = 2.5):
     """Applies a Gaussian Blur to the layer with the specified ID
     
     Args:
@@ -1480,13 +1566,13 @@ def apply_gaussian_blur(layer_id: int, radius: float = 2.5):
         "radius":radius,
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
 
 
 
 
 @mcp.tool()
-def apply_motion_blur(layer_id: int, angle: int = 0, distance: float = 30):
+async def apply_motion_blur(layer_id: int, angle: int = 0, distance: float = 30):
     """Applies a Motion Blur to the layer with the specified ID
 
     Args:
@@ -1509,8 +1595,69 @@ def apply_motion_blur(layer_id: int, angle: int = 0, distance: float = 30):
         "distance":distance
     })
 
-    return sendCommand(command)
+    return await sendCommand(command)
+
+
+# Tools that don't just send commands, so can't be run in a batch or as a job
+NON_BATCHABLE_TOOLS = [
+    "run_batch",
+    *jobs.JOB_TOOLS,
+    "get_document_image",
+    "get_layer_image",
+    "save_document_image_as_png",
+    "search_fonts",
+]
+
+
+@mcp.tool()
+async def run_batch(steps:list[dict], stop_on_error:bool = True, atomic:bool = False, history_name:str = None):
+    """
+    Runs several tools in Photoshop in a single call. The steps run in order, and document state is returned once after the last step. Use this when you know the next few steps up front, such as creating and positioning several layers.
+
+    Use atomic to run the steps as a single undoable history state. If any step fails, the document is rolled back to where it was before the batch, so there is nothing half built to repair.
+
+    Args:
+        steps (list[dict]): The tools to run. Each is a dict with the tool name and its arguments, for example {"tool": "set_layer_visibility", "arguments": {"layer_id": 3, "visible": false}}. The name can be given with or without the ps_ prefix the tools may be listed with. Image tools and search_fonts can't be batched.
+        stop_on_error (bool): Skip the remaining steps once one fails. Defaults to True. Atomic batches always stop.
+        atomic (bool): Roll back all of the steps if any step fails. Requires an open document. Defaults to False
+        history_name (str): Name of the history state for an atomic batch
+
+    Returns:
+        dict: The response, with a result for each step in response.results, and the document, layer and selection state asked for by the steps.
+    """
+
+    commands = []
+    step_indexes = []
+
+    for i, step in enumerate(steps):
+        name = step.get("tool")
+        tool = get_tool(mcp, name)
+
+        if not tool or tool.name in NON_BATCHABLE_TOOLS:
+            raise ValueError(f"Step {i} : {name} is not a tool that can be run in a batch")
+
+        captured = await client.captureCommands(tool.run, step.get("arguments", {}))
+        commands.extend(captured)
+        step_indexes.extend([i] * len(captured))
+
+    response = await client.sendBatch(commands, stop_on_error, atomic, history_name)
+
+    # label each result with the step it came from
+    for i, result in zip(step_indexes, response["response"]["results"]):
+        result["step"] = i
+        result["tool"] = steps[i]["tool"]
+
+    return response
+
+jobs.register_tools(
+    mcp,
+    client,
+    NON_BATCHABLE_TOOLS,
+    "Photoshop",
+    ["generative_fill", "generate_image", "harmonize_layer", "export_layers_as_png"]
+)
 
+register_search_fonts(mcp)
 
 @mcp.resource("config://get_instructions")
 def get_instructions() -> str:
@@ -1530,6 +1677,9 @@ def get_instructions() -> str:
     5. Always use alignment (align_content()) to position your text.
     6. Read the info for the API calls to make sure you understand the requirements and arguments
     7. When you make a selection, clear it once you no longer need it
+    8. Call get_layers when you need the current layer ids and structure. Most commands do not return it.
+    9. When you know the next few steps up front, run them together with run_batch
+    10. Start slow tools such as generate_image and generative_fill with submit_job, keep working, and collect the results with wait_for_jobs
 
     Here are some general tips for when working with Photoshop.
 
@@ -1566,10 +1716,9 @@ def get_instructions() -> str:
 
     interpolation_methods: {", ".join(interpolation_methods)}
 
-    fonts: {", ".join(font_names[:FONT_LIMIT])}
+    fonts: Use search_fonts to find the PostScript name of a font
     """
 
-font_names = list_all_fonts_postscript()
 
 interpolation_methods = [
    "AUTOMATIC",
@@ -20,11 +20,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import socketio
-import time
-import threading
+import asyncio
 import json
-from queue import Queue
+import time
+import uuid
 import logger
 
 # Global configuration variables
@@ -32,125 +31,492 @@ proxy_url = None
 proxy_timeout = None
 application = None
 
-def send_message_blocking(command, timeout=None):
+# Seconds to wait for the initial websocket handshake with the proxy
+CONNECT_TIMEOUT = 5
+
+# Backoff used by the Socket.IO client when reconnecting after a dropped connection
+RECONNECT_DELAY = 0.5
+RECONNECT_DELAY_MAX = 10
+
+# Shared connection to the proxy, created on first use
+_connection = None
+
+# Error codes the proxy replies with when a command can not be delivered
+NO_HOST = "NO_HOST"
+HOST_BUSY = "HOST_BUSY"
+HOST_STALE = "HOST_STALE"
+DEADLINE_EXCEEDED = "DEADLINE_EXCEEDED"
+CANCELLED = "CANCELLED"
+
+# Seconds to wait for the proxy to acknowledge a cancel
+CANCEL_TIMEOUT = 2
+
+class ProxyConnection:
+    """
+    Long-lived asyncio Socket.IO connection to the command proxy server.
+
+    The connection is opened on first use and kept open across calls. Any
+    number of tasks can send commands over it at the same time. Each
+    command carries a requestId, which is used to match the packet_response
+    coming back from the proxy to the coroutine awaiting it.
+
+    If the connection drops, pending commands fail right away and the
+    Socket.IO client reconnects in the background with exponential backoff.
+
+    The proxy pushes the application instances connected to it whenever
+    they change. Commands for an application with no live instance fail
+    right away, without a round trip.
+
+    The connection belongs to the event loop it was created on.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.loop = asyncio.get_running_loop()
+
+        # python-socketio and aiohttp are only loaded once the first command
+        # is sent, so they don't slow down server startup
+        import socketio
+
+        self._sio = socketio.AsyncClient(
+            logger=False,
+            reconnection=True,
+            reconnection_delay=RECONNECT_DELAY,
+            reconnection_delay_max=RECONNECT_DELAY_MAX
+        )
+
+        self._sio.on("connect", self._on_connect)
+        self._sio.on("disconnect", self._on_disconnect)
+        self._sio.on("packet_response", self._on_packet_response)
+        self._sio.on("presence", self._on_presence)
+
+        # requestId -> Future the waiting caller is awaiting
+        self._pending = {}
+
+        self._connect_lock = asyncio.Lock()
+        self._connected = asyncio.Event()
+        self._reconnecting = False
+        self._closing = False
+
+        # application -> [{instanceId, stale}] as last sent by the proxy, or
+        # None until the proxy has sent it
+        self.presence = None
+
+    async def _on_connect(self):
+        logger.log(f"Connected to server with session ID: {self._sio.sid}")
+        self._reconnecting = False
+        self._connected.set()
+
+        await self._sio.emit("presence_subscribe")
+
+    async def _on_disconnect(self, *args):
+        logger.log("Disconnected from server")
+        self._connected.clear()
+        self.presence = None
+
+        # The Socket.IO client reconnects on its own unless we closed it
+        self._reconnecting = not self._closing
+
+        # Responses are routed back by session id, so anything still
+        # in flight on the old session will never be answered
+        self._fail_pending(
+            RuntimeError(f"Connection to command proxy server at {self.url} was lost.")
+        )
+
+    async def _on_packet_response(self, data):
+        logger.log(f"Received response: {_loggable(data)}")
+
+        request_id = data.get("requestId") if isinstance(data, dict) else None
+        future = self._pending.pop(request_id, None)
+
+        # Plugins that do not echo the requestId: the response can only be
+        # matched up when a single command is waiting. With more than one
+        # it could belong to any of them, including one that has already
+        # timed out, so it is dropped and the command waiting for it times
+        # out. A response with a requestId that is not pending is late, for
+        # a command that timed out, and is dropped too.
+        if request_id is None and len(self._pending) == 1:
+            future = self._pending.pop(next(iter(self._pending)))
+
+        if future is None or future.done():
+            logger.log(f"Received response with no pending request: {request_id}")
+            return
+
+        future.set_result(data)
+
+    async def _on_presence(self, data):
+        logger.log(f"Received presence: {data}")
+        self.presence = data
+
+    def check_presence(self, app, instance_id=None):
+        """
+        Returns the error code the proxy would reply with if a command for
+        app were sent now, based on the presence it last sent, or None if
+        the command should be sent.
+
+        Args:
+            app (str): The application the command is for
+            instance_id (str): The instance the command is for, if any
+        """
+        if self.presence is None:
+            return None
+
+        instances = self.presence.get(app) or []
+        if instance_id:
+            instances = [i for i in instances if i.get("instanceId") == instance_id]
+
+        if not instances:
+            return NO_HOST
+
+        if all(i.get("stale") for i in instances):
+            return HOST_STALE
+
+        return None
+
+    def _fail_pending(self, error):
+        pending = list(self._pending.values())
+        self._pending.clear()
+
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    async def connect(self, timeout):
+        """
+        Makes sure the connection is open, connecting if needed.
+
+        Args:
+            timeout (float): Maximum time to wait for the connection in seconds
+
+        Raises:
+            ConnectionError: If the proxy server could not be reached
+        """
+        if self._sio.connected:
+            return
+
+        # A dropped connection is being re-established in the background
+        if self._reconnecting:
+            try:
+                await asyncio.wait_for(
+                    self._connected.wait(), min(timeout, CONNECT_TIMEOUT)
+                )
+                return
+            except asyncio.TimeoutError:
+                raise ConnectionError(f"Timed out reconnecting to {self.url}")
+
+        async with self._connect_lock:
+            if self._sio.connected:
+                return
+
+            self._closing = False
+            await self._sio.connect(
+                self.url,
+                transports=["websocket"],
+                wait_timeout=min(timeout, CONNECT_TIMEOUT)
+            )
+
+    async def send(self, packet, timeout):
+        """
+        Sends a command_packet and waits for its response.
+
+        Args:
+            packet (dict): The command packet, including its requestId
+            timeout (float): Maximum time to wait for the response in seconds
+
+        Returns:
+            dict: The response packet
+
+        Raises:
+            TimeoutError: If no response arrived in time
+            RuntimeError: If the connection was lost while waiting
+
+        If the wait times out or the calling task is cancelled, the plugin is
+        asked to cancel the command so it does not keep the host busy.
+        """
+        request_id = packet["requestId"]
+        future = self.loop.create_future()
+        self._pending[request_id] = future
+
+        try:
+            await self._sio.emit("command_packet", packet)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._cancel_in_background(request_id)
+            raise TimeoutError(f"No response received within {timeout} seconds")
+        except asyncio.CancelledError:
+            self._cancel_in_background(request_id)
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def cancel(self, request_id):
+        """
+        Asks the plugin running a command to cancel it. Plugins stop long
+        running commands at the next point where it is safe to, and reply to
+        the command with a CANCELLED error. Commands that have no such point
+        run to the end.
+
+        Args:
+            request_id (str): The requestId of the command
+
+        Returns:
+            bool: True if the proxy found the command running, False if it
+                had already finished or the proxy is not connected
+        """
+        if not self._sio.connected:
+            return False
+
+        try:
+            result = await self._sio.call(
+                "cancel_command", {"requestId": request_id}, timeout=CANCEL_TIMEOUT
+            )
+        except Exception as e:
+            logger.log(f"Error cancelling request {request_id}: {e}")
+            return False
+
+        return bool(result and result.get("found"))
+
+    def _cancel_in_background(self, request_id):
+        # The caller has stopped waiting, so don't make it wait for this too
+        asyncio.ensure_future(self.cancel(request_id), loop=self.loop)
+
+    async def close(self):
+        self._closing = True
+        self._reconnecting = False
+        if self._sio.connected:
+            await self._sio.disconnect()
+
+    def discard(self):
+        """
+        Shuts the connection down from outside its event loop, when it is
+        being replaced by a connection on a new loop.
+
+        If the old loop is still running the socket is disconnected on it.
+        Otherwise nothing can run there any more, so the socket is left to be
+        garbage collected and only the commands waiting on it are failed.
+        """
+        self._closing = True
+        self._reconnecting = False
+
+        if self.loop.is_running() and not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.close(), self.loop)
+            return
+
+        try:
+            self._fail_pending(
+                RuntimeError(f"Connection to command proxy server at {self.url} was replaced.")
+            )
+        except RuntimeError:
+            # the futures can't schedule their callbacks on a closed loop
+            self._pending.clear()
+
+def get_connection():
+    """
+    Returns the shared connection to the configured proxy server, creating it
+    if needed. Must be called from within a running event loop.
+    """
+    global _connection
+
+    loop = asyncio.get_running_loop()
+
+    if _connection is None or _connection.url != proxy_url or _connection.loop is not loop:
+        if _connection is not None:
+            _connection.discard()
+        _connection = ProxyConnection(proxy_url)
+
+    return _connection
+
+async def close():
+    """Closes the shared connection to the proxy server, if open."""
+    global _connection
+
+    if _connection:
+        await _connection.close()
+        _connection = None
+
+async def cancel(request_id):
+    """
+    Asks the plugin running a command to cancel it. See ProxyConnection.cancel.
+
+    Args:
+        request_id (str): The requestId of the command
+
+    Returns:
+        bool: True if the command was found running
     """
-    Blocking function that connects to a Socket.IO server, sends a message,
-    waits for a response, then disconnects.
+    if _connection is None:
+        return False
+
+    return await _connection.cancel(request_id)
+
+async def send_message(command, timeout=None):
+    """
+    Sends a command over the shared proxy connection and waits for its
+    response without blocking the event loop.
+
+    The connection is opened on the first call and reused afterwards, so
+    commands do not pay for a new websocket handshake each time.
     
     Args:
         command: The command to send
-        timeout (int): Maximum time to wait for response in seconds
+        timeout (int): Maximum time to wait for response in seconds. Defaults
+            to the time left until the command's deadline, if it has one, or
+            the configured timeout.
         
     Returns:
         dict: The response received from the server, or None if no response
     """
     # Use global variables
     global application, proxy_url, proxy_timeout
+
+    # Commands carry the application they are for, so servers for several
+    # applications can share the connection
+    app = command.get("application") or application
     
     # Check if configuration is set
-    if not application or not proxy_url or not proxy_timeout:
+    if not app or not proxy_url or not proxy_timeout:
         logger.log("Socket client not configured. Call configure() first.")
         return None
     
-    # Use provided timeout or default
-    wait_timeout = timeout if timeout is not None else proxy_timeout
-    
-    # Create a standard (non-async) SocketIO client with WebSocket transport only
-    sio = socketio.Client(logger=False)
-    
-    # Use a queue to get the response from the event handler
-    response_queue = Queue()
-    
-    connection_failed = [False]         
+    # Use provided timeout, the command's deadline or the default
+    deadline = command.get("deadline")
+    if timeout is not None:
+        wait_timeout = timeout
+    elif deadline:
+        wait_timeout = deadline / 1000 - time.time()
+    else:
+        wait_timeout = proxy_timeout
+
+    if wait_timeout <= 0:
+        raise DeadlineExceededError(
+            DEADLINE_EXCEEDED,
+            f"{command.get('action')} was not sent because its deadline has passed"
+        )
+
+    connection = get_connection()
+
+    try:
+        await connection.connect(wait_timeout)
+    except Exception as e:
+        logger.log(f"Connection error: {e}")
+        raise RuntimeError(f"Error: Could not connect to {app} command proxy server. Make sure that the proxy server is running listening on the correct url {proxy_url}.")
+
+    # Fail fast if the proxy has already told us no instance can take it
+    error_code = connection.check_presence(app, command.get("instanceId"))
+    if error_code:
+        raise HostUnavailableError(
+            error_code,
+            f"{app} is not available ({error_code}). Make sure that {app} is running and that the MCP Plugin is connected."
+        )
+
+    # The requestId travels inside the command so that plugins can echo it
+    # back, and on the packet so that the proxy can see it
+    request_id = command.setdefault("requestId", uuid.uuid4().hex)
+
+    packet = {
+        'type': "command",
+        'application': app,
+        'command': command,
+        'requestId': request_id
+    }
 
-    @sio.event
-    def connect():
-        logger.log(f"Connected to server with session ID: {sio.sid}")
-        
-        # Send the command
-        logger.log(f"Sending message to {application}: {command}")
-        sio.emit('command_packet', {
-            'type': "command",
-            'application': application,
-            'command': command
-        })
-    
-    @sio.event
-    def packet_response(data):
-        logger.log(f"Received response: {data}")
-        response_queue.put(data)
-        # Disconnect after receiving the response
-        sio.disconnect()
-    
-    @sio.event
-    def disconnect():
-        logger.log("Disconnected from server")
-        # If we disconnect without response, put None in the queue
-        if response_queue.empty():
-            response_queue.put(None)
-    
-    @sio.event
-    def connect_error(error):
-        logger.log(f"Connection error: {error}")
-        connection_failed[0] = True
-        response_queue.put(None)
-    
-    # Connect in a separate thread to avoid blocking the main thread during connection
-    def connect_and_wait():
-        try:
-            sio.connect(proxy_url, transports=['websocket'])
-            # Keep the client running until disconnect is called
-            sio.wait()
-        except Exception as e:
-            logger.log(f"Error: {e}")
-            connection_failed[0] = True
-            if response_queue.empty():
-                response_queue.put(None)
-            if sio.connected:
-                sio.disconnect()
-    
-    # Start the client in a separate thread
-    client_thread = threading.Thread(target=connect_and_wait)
-    client_thread.daemon = True
-    client_thread.start()
-    
     try:
         # Wait for a response or timeout
+        logger.log(f"Sending message to {app}: {command}")
         logger.log("waiting for response...")
-        response = response_queue.get(timeout=wait_timeout)
-
-        if connection_failed[0]:
-            raise RuntimeError(f"Error: Could not connect to {application} command proxy server. Make sure that the proxy server is running listening on the correct url {proxy_url}.")
+        response = await connection.send(packet, wait_timeout)
 
         if response:
             logger.log("response received...")
             try:
-                logger.log(json.dumps(response))
+                logger.log(json.dumps(_loggable(response)))
             except:
-                logger.log(f"Response (not JSON-serializable): {response}")
+                logger.log(f"Response (not JSON-serializable): {_loggable(response)}")
 
             if response["status"] == "FAILURE":
-                raise AppError(f"Error returned from {application}: {response['message']}")
+                error_type = _ERROR_TYPES.get(response.get("errorCode"))
+                if error_type:
+                    raise error_type(response["errorCode"], response["message"])
+                raise AppError(f"Error returned from {app}: {response['message']}")
             
         return response
     except AppError:
         raise
+    except TimeoutError as e:
+        logger.log(f"Error waiting for response: {e}")
+        raise CommandTimeoutError(f"Error: Could not connect to {app}. Connection Timed Out. Make sure that {app} is running and that the MCP Plugin is connected. Original error: {e}")
     except Exception as e:
         logger.log(f"Error waiting for response: {e}")
-        if sio.connected:
-            sio.disconnect()
-  
-        raise RuntimeError(f"Error: Could not connect to {application}. Connection Timed Out. Make sure that {application} is running and that the MCP Plugin is connected. Original error: {e}")
-    finally:
-        # Make sure client is disconnected
-        if sio.connected:
-            sio.disconnect()
-        # Wait for the thread to finish (should be quick after disconnect)
-        client_thread.join(timeout=1)
+        raise RuntimeError(f"Error: Could not connect to {app}. Connection Timed Out. Make sure that {app} is running and that the MCP Plugin is connected. Original error: {e}")
+
+def _loggable(value):
+    """
+    Returns a copy of a response with binary attachments, such as images,
+    replaced by a short description so they are not written to the log.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict):
+        return {k: _loggable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_loggable(v) for v in value]
+    return value
 
 class AppError(Exception):
     pass
 
+class CommandTimeoutError(RuntimeError):
+    """Raised when no response to a command arrived before its timeout."""
+    pass
+
+class HostUnavailableError(AppError):
+    """
+    Raised when the proxy could not deliver a command to the application.
+
+    Attributes:
+        code (str): NO_HOST if no instance of the application is connected,
+            HOST_BUSY if too many commands are waiting for it, or HOST_STALE
+            if it has stopped sending heartbeats
+    """
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+class DeadlineExceededError(AppError):
+    """
+    Raised when a command was dropped, without being run, because it
+    reached the proxy or the plugin after its deadline.
+
+    Attributes:
+        code (str): DEADLINE_EXCEEDED
+    """
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+class CommandCancelledError(AppError):
+    """
+    Raised when the plugin stopped a command because it was cancelled.
+
+    Attributes:
+        code (str): CANCELLED
+    """
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+# errorCode in a FAILURE response -> the error raised for it
+_ERROR_TYPES = {
+    NO_HOST: HostUnavailableError,
+    HOST_BUSY: HostUnavailableError,
+    HOST_STALE: HostUnavailableError,
+    DEADLINE_EXCEEDED: DeadlineExceededError,
+    CANCELLED: CommandCancelledError,
+}
+
 def configure(app=None, url=None, timeout=None):
     
     global application, proxy_url, proxy_timeout
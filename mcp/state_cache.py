@@ -0,0 +1,263 @@
+# MIT License
+#
+# Copyright (c) 2025 Mike Chambers
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import logger
+from collections import OrderedDict
+
+class LayerTreeCache:
+    """
+    Client side copy of the Photoshop layer tree, kept up to date from the
+    layersDelta the plugin attaches to replies.
+
+    The plugin sends only the layers that were added, changed or removed
+    since the revision this cache holds, so large documents cost O(changes)
+    per call instead of O(layers). The nested tree in the same shape as
+    getLayers can be rebuilt on demand with to_tree().
+    """
+
+    def __init__(self):
+        self.document_id = None
+        self.revision = None
+
+        # layer id -> layer info, including its parentId and index
+        self._layers = {}
+
+    def base(self):
+        """
+        Returns the {documentId, revision} the plugin should diff against,
+        or None if the cache is empty.
+        """
+        if self.revision is None:
+            return None
+
+        return {
+            "documentId": self.document_id,
+            "revision": self.revision
+        }
+
+    def apply(self, delta):
+        """
+        Applies a layersDelta from the plugin.
+
+        Args:
+            delta (dict): Delta with documentId, baseRevision, revision and
+                added, changed and removed lists. A baseRevision of None
+                means the delta contains the whole tree.
+
+        Returns:
+            bool: True if the delta was applied, False if it was based on a
+                revision this cache does not hold and was ignored
+        """
+        base_revision = delta.get("baseRevision")
+
+        if base_revision is None:
+            self._layers = {}
+        elif delta["documentId"] != self.document_id or base_revision != self.revision:
+            logger.log(f"Ignoring layer delta based on revision {base_revision}, cache is at {self.revision}")
+            return False
+
+        for layer_id in delta.get("removed", []):
+            self._layers.pop(layer_id, None)
+
+        for layer in delta.get("added", []) + delta.get("changed", []):
+            self._layers[layer["id"]] = layer
+
+        self.document_id = delta["documentId"]
+        self.revision = delta["revision"]
+
+        return True
+
+    def to_tree(self):
+        """
+        Returns the nested list of layers in the same shape as getLayers.
+        """
+        children = {}
+        for layer in self._layers.values():
+            children.setdefault(layer.get("parentId"), []).append(layer)
+
+        def build(parent_id):
+            out = []
+            for layer in sorted(children.get(parent_id, []), key=lambda l: l["index"]):
+                info = {k: v for k, v in layer.items() if k not in ("parentId", "index")}
+
+                sublayers = build(layer["id"])
+                if sublayers:
+                    info["layers"] = sublayers
+
+                out.append(info)
+            return out
+
+        return build(None)
+
+    def clear(self):
+        self.document_id = None
+        self.revision = None
+        self._layers = {}
+
+class SequenceCache:
+    """
+    Client side copy of the Premiere sequences and project info, kept up to
+    date from the sequencesDelta the plugin attaches to replies.
+
+    The plugin only queries sequences that a command touched and only sends
+    what changed since the revision this cache holds.
+    """
+
+    def __init__(self):
+        self.project_id = None
+        self.revision = None
+        self.project = None
+
+        # sequence id -> sequence info, in the order the plugin listed them
+        self._sequences = {}
+
+    def base(self):
+        """
+        Returns the {projectId, revision} the plugin should diff against,
+        or None if the cache is empty.
+        """
+        if self.revision is None:
+            return None
+
+        return {
+            "projectId": self.project_id,
+            "revision": self.revision
+        }
+
+    def apply(self, delta):
+        """
+        Applies a sequencesDelta from the plugin.
+
+        Args:
+            delta (dict): Delta with projectId, baseRevision, revision,
+                added, changed and removed lists and, when it changed,
+                project. A baseRevision of None means the delta contains
+                everything.
+
+        Returns:
+            bool: True if the delta was applied, False if it was based on a
+                revision this cache does not hold and was ignored
+        """
+        base_revision = delta.get("baseRevision")
+
+        if base_revision is None:
+            self._sequences = {}
+        elif delta["projectId"] != self.project_id or base_revision != self.revision:
+            logger.log(f"Ignoring sequence delta based on revision {base_revision}, cache is at {self.revision}")
+            return False
+
+        for sequence_id in delta.get("removed", []):
+            self._sequences.pop(sequence_id, None)
+
+        for sequence in delta.get("added", []) + delta.get("changed", []):
+            self._sequences[sequence["id"]] = sequence
+
+        if "project" in delta:
+            self.project = delta["project"]
+
+        self.project_id = delta["projectId"]
+        self.revision = delta["revision"]
+
+        return True
+
+    def sequences(self):
+        """Returns the list of sequences in the same shape as getSequences."""
+        return list(self._sequences.values())
+
+    def clear(self):
+        self.project_id = None
+        self.revision = None
+        self.project = None
+        self._sequences = {}
+
+class PreviewCache:
+    """
+    Bounded LRU cache of preview images from Photoshop.
+
+    Entries are keyed by (document id, layer id, pixel revision, max edge).
+    The plugin bumps the pixel revision of a document whenever a command
+    changes its pixels, and reports it on every reply, so a cached preview is
+    only returned while no pixel changing command has run since it was taken.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # {documentId, revision} from the most recent reply
+        self.pixel_revision = None
+
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def update_revision(self, pixel_revision):
+        """
+        Records the pixelRevision attached to a reply.
+
+        Args:
+            pixel_revision (dict): {documentId, revision}, or None if no
+                document is open
+        """
+        self.pixel_revision = pixel_revision
+
+    def key(self, layer_id, max_edge):
+        """
+        Returns the cache key for a preview of the active document at its
+        current revision, or None if the revision is not known yet.
+        """
+        if not self.pixel_revision:
+            return None
+
+        return (
+            self.pixel_revision["documentId"],
+            layer_id,
+            self.pixel_revision["revision"],
+            max_edge
+        )
+
+    def get(self, key):
+        """Returns the cached image bytes for key, or None."""
+        if key is None or key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, data):
+        """Adds image bytes to the cache, evicting the least recently used."""
+        if key is None or len(data) > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+
+        self._entries[key] = data
+        self._size += len(data)
+
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self):
+        self.pixel_revision = None
+        self._entries.clear()
+        self._size = 0
@@ -0,0 +1,89 @@
+# MIT License
+#
+# Copyright (c) 2025 Mike Chambers
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import sys
+import json
+import logger
+
+APP_NAME = "adb-mcp"
+
+def get_cache_dir():
+    """
+    Returns the directory where the MCP servers keep their caches, creating it
+    if needed.
+
+    Returns:
+        str: %LOCALAPPDATA%/adb-mcp on Windows, ~/Library/Caches/adb-mcp on
+            macOS and $XDG_CACHE_HOME/adb-mcp (~/.cache/adb-mcp) elsewhere
+    """
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+
+    cache_dir = os.path.join(base, APP_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def load_json(name, default=None):
+    """
+    Loads a JSON file from the cache directory.
+
+    Args:
+        name (str): File name within the cache directory
+        default: Value to return if the file is missing or can't be read
+
+    Returns:
+        The parsed JSON, or default
+    """
+    try:
+        with open(os.path.join(get_cache_dir(), name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        logger.log(f"Could not read cache file {name}: {e}")
+        return default
+
+def save_json(name, data):
+    """
+    Saves data as JSON in the cache directory. The file is written to a
+    temporary file first and then moved into place, so a crash or a second
+    server writing at the same time can't leave a partial file.
+
+    Args:
+        name (str): File name within the cache directory
+        data: JSON serializable data to save
+    """
+    try:
+        path = os.path.join(get_cache_dir(), name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.log(f"Could not write cache file {name}: {e}")
@@ -128,9 +128,27 @@ const requiresActiveDocument = (command) => {
     return !["createDocument"].includes(command.action);
 };
 
+//true if the command's deadline, in milliseconds since the epoch, has
+//passed, which means the sender is no longer waiting for it
+const isExpired = (command) => {
+    return command.deadline !== undefined && Date.now() > command.deadline;
+};
+
+//Fills in the response to a command that was not run because it expired
+const createExpiredResponse = (out, command) => {
+    out.status = "FAILURE";
+    out.errorCode = "DEADLINE_EXCEEDED";
+    out.message = `${command.action} was not run because its deadline passed ${
+        Date.now() - command.deadline
+    } ms ago`;
+    return out;
+};
+
 
 module.exports = {
     getActiveDocumentSettings,
     checkRequiresActiveDocument,
-    parseAndRouteCommand
+    parseAndRouteCommand,
+    isExpired,
+    createExpiredResponse
 };
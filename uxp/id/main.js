@@ -29,20 +29,38 @@ const {
     parseAndRouteCommand,
     checkRequiresActiveDocument,
     getActiveDocumentSettings,
+    isExpired,
+    createExpiredResponse,
 } = require("./commands/index.js");
 
 const APPLICATION = "indesign";
 const PROXY_URL = "http://localhost:3001";
 
+//lets the proxy tell this InDesign apart from others that are connected
+const INSTANCE_ID = `${APPLICATION}-${Date.now().toString(36)}-${Math.random()
+    .toString(36)
+    .slice(2, 8)}`;
+
+//milliseconds between heartbeats. They stop while InDesign is busy, since the
+//plugin runs on its main thread.
+const HEARTBEAT_INTERVAL = 5000;
+
 let socket = null;
+let heartbeatTimer = null;
 
 const onCommandPacket = async (packet) => {
     let command = packet.command;
 
     let out = {
         senderId: packet.senderId,
+        requestId: packet.requestId,
+        instanceId: INSTANCE_ID,
     };
 
+    if (isExpired(command)) {
+        return createExpiredResponse(out, command);
+    }
+
     try {
         //this will throw if an active document is required and not open
         checkRequiresActiveDocument(command);
@@ -81,7 +99,16 @@ function connectToServer() {
     socket.on("connect", () => {
         updateButton();
         console.log("Connected to server with ID:", socket.id);
-        socket.emit("register", { application: APPLICATION });
+        socket.emit("register", {
+            application: APPLICATION,
+            instanceId: INSTANCE_ID,
+            heartbeatInterval: HEARTBEAT_INTERVAL,
+        });
+
+        clearInterval(heartbeatTimer);
+        heartbeatTimer = setInterval(() => {
+            socket.emit("heartbeat");
+        }, HEARTBEAT_INTERVAL);
     });
 
     socket.on("command_packet", async (packet) => {
@@ -102,6 +129,8 @@ function connectToServer() {
     });
 
     socket.on("disconnect", (reason) => {
+        clearInterval(heartbeatTimer);
+        heartbeatTimer = null;
         updateButton();
         console.log("Disconnected from server. Reason:", reason);
 
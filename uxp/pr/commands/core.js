@@ -14,7 +14,8 @@ const {
     findProjectItem,
     execute,
     getTrack,
-    getTrackItems
+    getTrackItems,
+    checkCancelled
 } = require("./utils.js")
 
 const saveProject = async (command) => {
@@ -559,6 +560,9 @@ const exportSequence = async (command) => {
 
     const sequence = await _getSequenceFromId(sequenceId);
 
+    //the export can not be stopped once started
+    checkCancelled(command);
+
     await manager.exportSequence(sequence, constants.ExportType.IMMEDIATELY, outputPath, presetPath);
 }
 
@@ -0,0 +1,212 @@
+/* MIT License
+ *
+ * Copyright (c) 2025 Mike Chambers
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in all
+ * copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+ * SOFTWARE.
+ */
+
+const app = require("premierepro");
+const { getSequenceInfo } = require("./utils.js");
+const { getProjectInfo } = require("./index.js");
+
+//Commands that never change sequences or project contents
+const READ_ONLY_ACTIONS = [
+    "exportFrame",
+    "exportSequence",
+    "saveProject",
+];
+
+//Commands that change project items or bins, but not existing sequences.
+//New sequences are picked up when the sequence list is next read.
+const PROJECT_ACTIONS = [
+    "importMedia",
+    "moveProjectItemsToBin",
+    "createBinInActiveProject",
+    "createSequenceFromMedia",
+    "saveProjectAs",
+];
+
+//Commands that read the current state, so everything is queried again to
+//pick up changes made by hand in Premiere
+const REFRESH_ACTIONS = ["getProjectInfo"];
+
+//Cached sequence and project info for the active project. Sequences are
+//only queried again when a command marks them as dirty.
+let state = {
+    projectId: null,
+    revision: 0,
+    sequences: {},
+    project: null,
+    dirtySequences: new Set(),
+    allDirty: true,
+    projectDirty: true,
+};
+
+const resetState = (projectId) => {
+    state = {
+        projectId: projectId,
+        revision: state.revision,
+        sequences: {},
+        project: null,
+        dirtySequences: new Set(),
+        allDirty: true,
+        projectDirty: true,
+    };
+};
+
+//Marks the state touched by a command as needing to be queried again. Call
+//before the command runs, so the state is still queried again if it fails
+//part way through.
+const invalidateState = (command) => {
+    const action = command.action;
+
+    if (READ_ONLY_ACTIONS.includes(action)) {
+        return;
+    }
+
+    if (REFRESH_ACTIONS.includes(action)) {
+        state.allDirty = true;
+        state.projectDirty = true;
+        return;
+    }
+
+    if (PROJECT_ACTIONS.includes(action)) {
+        state.projectDirty = true;
+        return;
+    }
+
+    const sequenceId = command.options ? command.options.sequenceId : null;
+
+    if (sequenceId) {
+        state.dirtySequences.add(sequenceId);
+        return;
+    }
+
+    //unknown scope, so query everything again
+    state.allDirty = true;
+    state.projectDirty = true;
+};
+
+//Returns the sequences and project info that changed since the state the
+//client last received. base is the {projectId, revision} the client has. If
+//it does not match, everything is returned in added and baseRevision is
+//null.
+const getSequencesDelta = async (base) => {
+    let project = await app.Project.getActiveProject();
+    const projectId = project.guid.toString();
+
+    if (projectId !== state.projectId) {
+        resetState(projectId);
+    }
+
+    const previousRevision = state.revision;
+    const active = await project.getActiveSequence();
+    const activeId = active ? active.guid.toString() : null;
+
+    let added = [];
+    let changed = [];
+    let removed = [];
+
+    let seen = new Set();
+    let sequences = await project.getSequences();
+
+    for (const sequence of sequences) {
+        const id = sequence.guid.toString();
+        seen.add(id);
+
+        let cached = state.sequences[id];
+        let info = cached;
+
+        if (!cached || state.allDirty || state.dirtySequences.has(id)) {
+            info = await getSequenceInfo(sequence, active);
+        } else if (cached.isActive !== (id === activeId)) {
+            info = { ...cached, isActive: id === activeId };
+        }
+
+        if (!cached) {
+            added.push(info);
+        } else if (JSON.stringify(info) !== JSON.stringify(cached)) {
+            changed.push(info);
+        }
+
+        state.sequences[id] = info;
+    }
+
+    for (const id in state.sequences) {
+        if (!seen.has(id)) {
+            removed.push(id);
+            delete state.sequences[id];
+        }
+    }
+
+    let projectInfo = state.project;
+    let projectChanged = false;
+
+    if (state.projectDirty || !projectInfo) {
+        projectInfo = await getProjectInfo();
+        projectChanged =
+            JSON.stringify(projectInfo) !== JSON.stringify(state.project);
+        state.project = projectInfo;
+    }
+
+    state.dirtySequences.clear();
+    state.allDirty = false;
+    state.projectDirty = false;
+
+    if (added.length || changed.length || removed.length || projectChanged) {
+        state.revision++;
+    }
+
+    const inSync =
+        base &&
+        base.projectId === projectId &&
+        base.revision === previousRevision;
+
+    if (inSync) {
+        let out = {
+            projectId: projectId,
+            baseRevision: previousRevision,
+            revision: state.revision,
+            added: added,
+            changed: changed,
+            removed: removed,
+        };
+
+        if (projectChanged) {
+            out.project = projectInfo;
+        }
+
+        return out;
+    }
+
+    return {
+        projectId: projectId,
+        baseRevision: null,
+        revision: state.revision,
+        added: Object.values(state.sequences),
+        changed: [],
+        removed: [],
+        project: projectInfo,
+    };
+};
+
+module.exports = {
+    invalidateState,
+    getSequencesDelta,
+};
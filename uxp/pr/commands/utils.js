@@ -235,6 +235,44 @@ const getTracks = async (sequence, trackType) => {
     return tracks;
 };
 
+const getSequenceInfo = async (sequence, active) => {
+    let size = await sequence.getFrameSize();
+    //let settings = await sequence.getSettings()
+
+    //let projectItem = await sequence.getProjectItem()
+    //let name = projectItem.name
+    let name = sequence.name;
+    let id = sequence.guid.toString();
+
+    let videoTracks = await getTracks(sequence,TRACK_TYPE.VIDEO);
+    let audioTracks = await getTracks(sequence, TRACK_TYPE.AUDIO);
+
+    let isActive = active == sequence;
+
+
+    let timebase = await sequence.getTimebase()
+    let fps = TICKS_PER_SECOND / timebase
+
+    let endTime = await sequence.getEndTime()
+    let durationSeconds = await endTime.seconds
+    let durationTicks = await endTime.ticksNumber
+    let ticksPerSecond = TICKS_PER_SECOND
+
+    return {
+        isActive,
+        name,
+        id,
+        frameSize: { width: size.width, height: size.height },
+        videoTracks,
+        audioTracks,
+        timebase,
+        fps,
+        durationSeconds,
+        durationTicks,
+        ticksPerSecond
+    };
+};
+
 const getSequences = async () => {
     let project = await app.Project.getActiveProject();
     let active = await project.getActiveSequence();
@@ -243,41 +281,7 @@ const getSequences = async () => {
 
     let out = [];
     for (const sequence of sequences) {
-        let size = await sequence.getFrameSize();
-        //let settings = await sequence.getSettings()
-
-        //let projectItem = await sequence.getProjectItem()
-        //let name = projectItem.name
-        let name = sequence.name;
-        let id = sequence.guid.toString();
-
-        let videoTracks = await getTracks(sequence,TRACK_TYPE.VIDEO);
-        let audioTracks = await getTracks(sequence, TRACK_TYPE.AUDIO);
-
-        let isActive = active == sequence;
-
-
-        let timebase = await sequence.getTimebase()
-        let fps = TICKS_PER_SECOND / timebase
-
-        let endTime = await sequence.getEndTime()
-        let durationSeconds = await endTime.seconds
-        let durationTicks = await endTime.ticksNumber
-        let ticksPerSecond = TICKS_PER_SECOND
-
-        out.push({
-            isActive,
-            name,
-            id,
-            frameSize: { width: size.width, height: size.height },
-            videoTracks,
-            audioTracks,
-            timebase,
-            fps,
-            durationSeconds,
-            durationTicks,
-            ticksPerSecond
-        });
+        out.push(await getSequenceInfo(sequence, active));
     }
 
     return out;
@@ -393,7 +397,59 @@ const getVideoTrack = async (sequence, trackIndex, clipIndex) => {
 }
     */
 
+//true if the command's deadline, in milliseconds since the epoch, has
+//passed, which means the sender is no longer waiting for it
+const isExpired = (command) => {
+    return command.deadline !== undefined && Date.now() > command.deadline;
+};
+
+//Fills in the response to a command that was not run because it expired
+const createExpiredResponse = (out, command) => {
+    out.status = "FAILURE";
+    out.errorCode = "DEADLINE_EXCEEDED";
+    out.message = `${command.action} was not run because its deadline passed ${
+        Date.now() - command.deadline
+    } ms ago`;
+    return out;
+};
+
+//requestId -> whether the sender has asked to cancel it, for each running
+//command. Premiere can't stop an export once it has started, so the only
+//check is in exportSequence, just before the export starts.
+const runningRequests = new Map();
+
+const startRequest = (command) => {
+    runningRequests.set(command.requestId, false);
+};
+
+const finishRequest = (command) => {
+    runningRequests.delete(command.requestId);
+};
+
+const cancelRequest = (requestId) => {
+    if (runningRequests.has(requestId)) {
+        runningRequests.set(requestId, true);
+    }
+};
+
+const isCancelled = (command) => {
+    return runningRequests.get(command.requestId) === true;
+};
+
+const checkCancelled = (command) => {
+    if (isCancelled(command)) {
+        throw new Error(`${command.action} was cancelled`);
+    }
+};
+
 module.exports = {
+    isExpired,
+    createExpiredResponse,
+    startRequest,
+    finishRequest,
+    cancelRequest,
+    isCancelled,
+    checkCancelled,
     getTrackItems,
     _getSequenceFromId,
     _setActiveSequence,
@@ -404,5 +460,6 @@ module.exports = {
     execute,
     getTracks,
     getSequences,
+    getSequenceInfo,
     getTrack,
 };
@@ -24,45 +24,84 @@
 const { entrypoints } = require("uxp");
 const { io } = require("./socket.io.js");
 
-const { getSequences } = require("./commands/utils.js");
-
 const {
-    getProjectInfo,
     parseAndRouteCommand,
     checkRequiresActiveProject,
 } = require("./commands/index.js");
 
+const {
+    invalidateState,
+    getSequencesDelta,
+} = require("./commands/state.js");
+
+const {
+    isExpired,
+    createExpiredResponse,
+    startRequest,
+    finishRequest,
+    cancelRequest,
+    isCancelled,
+} = require("./commands/utils.js");
+
 const APPLICATION = "premiere";
 const PROXY_URL = "http://localhost:3001";
 
+//lets the proxy tell this Premiere apart from others that are connected
+const INSTANCE_ID = `${APPLICATION}-${Date.now().toString(36)}-${Math.random()
+    .toString(36)
+    .slice(2, 8)}`;
+
+//milliseconds between heartbeats. They stop while Premiere is busy, since the
+//plugin runs on its main thread.
+const HEARTBEAT_INTERVAL = 5000;
+
 let socket = null;
+let heartbeatTimer = null;
 
 const onCommandPacket = async (packet) => {
     let command = packet.command;
 
     let out = {
         senderId: packet.senderId,
+        requestId: packet.requestId,
+        instanceId: INSTANCE_ID,
     };
 
+    if (isExpired(command)) {
+        return createExpiredResponse(out, command);
+    }
+
+    startRequest(command);
+
     try {
         //this will throw if an active document is required and not open
         await checkRequiresActiveProject(command);
 
+        //mark what the command may change before running it, in case it
+        //fails part way through
+        invalidateState(command);
+
         let response = await parseAndRouteCommand(command);
 
         out.response = response;
         out.status = "SUCCESS";
-        out.sequences = await getSequences();
-        out.project = await getProjectInfo();
-        
+
+        //only sequences touched since the client's copy are queried and sent
+        out.sequencesDelta = await getSequencesDelta(command.sequencesBase);
     } catch (e) {
 
         console.log(e)
 
         out.status = "FAILURE";
         out.message = `Error calling ${command.action} : ${e}`;
+
+        if (isCancelled(command)) {
+            out.errorCode = "CANCELLED";
+        }
     }
 
+    finishRequest(command);
+
     return out;
 };
 
@@ -75,7 +114,16 @@ function connectToServer() {
     socket.on("connect", () => {
         updateButton();
         console.log("Connected to server with ID:", socket.id);
-        socket.emit("register", { application: APPLICATION });
+        socket.emit("register", {
+            application: APPLICATION,
+            instanceId: INSTANCE_ID,
+            heartbeatInterval: HEARTBEAT_INTERVAL,
+        });
+
+        clearInterval(heartbeatTimer);
+        heartbeatTimer = setInterval(() => {
+            socket.emit("heartbeat");
+        }, HEARTBEAT_INTERVAL);
     });
 
     socket.on("command_packet", async (packet) => {
@@ -85,6 +133,11 @@ function connectToServer() {
         sendResponsePacket(response);
     });
 
+    socket.on("cancel_command", ({ requestId }) => {
+        console.log("Received cancel for request:", requestId);
+        cancelRequest(requestId);
+    });
+
     socket.on("registration_response", (data) => {
         console.log("Received response:", data);
         //TODO: connect button here
@@ -96,6 +149,8 @@ function connectToServer() {
     });
 
     socket.on("disconnect", (reason) => {
+        clearInterval(heartbeatTimer);
+        heartbeatTimer = null;
         updateButton();
         console.log("Disconnected from server. Reason:", reason);
 
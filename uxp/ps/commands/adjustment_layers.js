@@ -84,7 +84,7 @@ const addAdjustmentLayerBlackAndWhite = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const addBrightnessContrastAdjustmentLayer = async (command) => {
@@ -140,7 +140,7 @@ const addBrightnessContrastAdjustmentLayer = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const addAdjustmentLayerVibrance = async (command) => {
@@ -196,7 +196,7 @@ const addAdjustmentLayerVibrance = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const addColorBalanceAdjustmentLayer = async (command) => {
@@ -252,7 +252,7 @@ const addColorBalanceAdjustmentLayer = async (command) => {
             },
         ];
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const commandHandlers = {
@@ -35,7 +35,9 @@ const {
     execute,
     tokenify,
     hasActiveSelection,
-    listOpenDocuments
+    listOpenDocuments,
+    getTargetSize,
+    checkCancelled
 } = require("./utils");
 
 const { rasterizeLayer } = require("./layers").commandHandlers;
@@ -54,7 +56,7 @@ const openFile = async (command) => {
         }
 
         await app.open(entry);
-    });
+    }, command);
 };
 
 const placeImage = async (command) => {
@@ -122,26 +124,35 @@ const placeImage = async (command) => {
 
         await action.batchPlay(commands, {});
         await rasterizeLayer(command);
-    });
+    }, command);
 };
 
 const getDocumentImage = async (command) => {
+    let options = command.options;
+    let doc = app.activeDocument;
+
     let out = await execute(async () => {
 
         const pixelsOpt = {
             applyAlpha: true
         };
 
+        const targetSize = getTargetSize(doc.width, doc.height, options.maxEdge);
+        if (targetSize) {
+            pixelsOpt.targetSize = targetSize;
+        }
+
         const imgObj = await imaging.getPixels(pixelsOpt);
 
-        const base64Data = await imaging.encodeImageData({
+        //sent as raw bytes, which socket.io passes as a binary attachment
+        //rather than as base64 text inside the JSON payload
+        const jpegData = await imaging.encodeImageData({
             imageData: imgObj.imageData,
-            base64: true,
+            base64: false,
         });
 
         const result = {
-            base64Image: base64Data,
-            dataUrl: `data:image/jpeg;base64,${base64Data}`,
+            image: new Uint8Array(jpegData),
             width: imgObj.imageData.width,
             height: imgObj.imageData.height,
             colorSpace: imgObj.imageData.colorSpace,
@@ -151,7 +162,7 @@ const getDocumentImage = async (command) => {
 
         imgObj.imageData.dispose();
         return result;
-    });
+    }, command);
 
     return out;
 };
@@ -191,7 +202,7 @@ const cropDocument = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const removeBackground = async (command) => {
@@ -217,7 +228,7 @@ const removeBackground = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const alignContent = async (command) => {
@@ -259,13 +270,16 @@ const alignContent = async (command) => {
             },
         ];
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const generateImage = async (command) => {
     let options = command.options;
 
     await execute(async () => {
+        //may have been cancelled while waiting for the modal scope
+        checkCancelled(command);
+
         let doc = app.activeDocument;
 
         await doc.selection.selectAll();
@@ -344,7 +358,7 @@ const generateImage = async (command) => {
         //let l = findLayerByName(options.prompt);
         let l = findLayer(layerId);
         l.name = options.layerName;
-    });
+    }, command);
 };
 
 const generativeFill = async (command) => {
@@ -367,6 +381,9 @@ const generativeFill = async (command) => {
     }
 
     await execute(async () => {
+        //may have been cancelled while waiting for the modal scope
+        checkCancelled(command);
+
         let doc = app.activeDocument;
 
         let contentType = "none";
@@ -446,19 +463,19 @@ const generativeFill = async (command) => {
         //let l = findLayerByName(options.prompt);
         let l = findLayer(id);
         l.name = options.layerName;
-    });
+    }, command);
 };
 
 const saveDocument = async (command) => {
     await execute(async () => {
         await app.activeDocument.save();
-    });
+    }, command);
 };
 
 const saveDocumentAs = async (command) => {
     let options = command.options;
 
-    return await _saveDocumentAs(options.filePath, options.fileType);
+    return await _saveDocumentAs(options.filePath, options.fileType, command);
 };
 
 const setActiveDocument = async (command) => {
@@ -471,7 +488,7 @@ const setActiveDocument = async (command) => {
         if (doc.id === documentId) {
             await execute(async () => {
                 app.activeDocument = doc;
-            });
+            }, command);
 
             return
         }
@@ -489,7 +506,7 @@ const duplicateDocument = async (command) => {
     await execute(async () => {
         const doc = app.activeDocument;
         await doc.duplicate(name)
-    });
+    }, command);
 };
 
 const createDocument = async (command) => {
@@ -512,11 +529,11 @@ const createDocument = async (command) => {
         let background = findLayerByName("Background");
         background.allLocked = false;
         background.name = "Background";
-    });
+    }, command);
 };
 
-const executeBatchPlayCommand = async (commands) => {
-    let options = commands.options;
+const executeBatchPlayCommand = async (command) => {
+    let options = command.options;
     let c = options.commands;
 
 
@@ -524,7 +541,7 @@ const executeBatchPlayCommand = async (commands) => {
     let out = await execute(async () => {
         let o = await action.batchPlay(c, {});
         return o[0]
-    });
+    }, command);
 
     console.log(out)
     return out;
@@ -43,7 +43,7 @@ const applyMotionBlur = async (command) => {
 
     await execute(async () => {
         await layer.applyMotionBlur(options.angle, options.distance);
-    });
+    }, command);
 };
 
 const applyGaussianBlur = async (command) => {
@@ -61,7 +61,7 @@ const applyGaussianBlur = async (command) => {
 
     await execute(async () => {
         await layer.applyGaussianBlur(options.radius);
-    });
+    }, command);
 };
 
 const commandHandlers = {
@@ -30,6 +30,7 @@ const layerStyles = require("./layer_styles")
 const filters = require("./filters")
 const selection = require("./selection")
 const layers = require("./layers")
+const { execute, isExpired, checkCancelled } = require("./utils")
 
 const parseAndRouteCommands = async (commands) => {
     if (!commands.length) {
@@ -41,6 +42,71 @@ const parseAndRouteCommands = async (commands) => {
     }
 };
 
+//Runs a list of commands under a single modal scope and returns the result
+//of each one. Document state is attached once, for the batch as a whole.
+//Atomic batches run as a single history state, and are rolled back if any
+//command fails, the batch deadline passes or the batch is cancelled.
+const runBatch = async (command) => {
+    const options = command.options;
+    const commands = options.commands || [];
+    const atomic = options.atomic === true;
+    const stopOnError = atomic || options.stopOnError !== false;
+
+    let executeOptions = { commandName: "Running batch" };
+    if (atomic) {
+        executeOptions.historyName = options.historyName || "MCP Batch";
+    }
+
+    return await execute(
+        async (context) => {
+            let results = [];
+            let failed = false;
+
+            for (const [i, c] of commands.entries()) {
+                if (failed) {
+                    results.push({ status: "SKIPPED" });
+                    continue;
+                }
+
+                //the sender has given up on the batch, so stop here
+                if (isExpired(command)) {
+                    throw new Error(
+                        `Batch deadline passed before command ${i} (${c.action})`
+                    );
+                }
+                checkCancelled(command);
+
+                //run in the batch's modal scope, and stop if the batch is
+                //cancelled
+                c.batchContext = context;
+                c.batchRequestId = command.requestId;
+
+                try {
+                    checkRequiresActiveDocument(c);
+                    let response = await parseAndRouteCommand(c);
+                    results.push({ status: "SUCCESS", response: response });
+                } catch (e) {
+                    if (atomic) {
+                        throw new Error(
+                            `Batch rolled back. Command ${i} (${c.action}) failed : ${e}`
+                        );
+                    }
+
+                    results.push({
+                        status: "FAILURE",
+                        message: `Error calling ${c.action} : ${e}`,
+                    });
+                    failed = stopOnError;
+                }
+            }
+
+            return { results: results };
+        },
+        command,
+        executeOptions
+    );
+};
+
 const parseAndRouteCommand = async (command) => {
     let action = command.action;
 
@@ -67,7 +133,7 @@ const checkRequiresActiveDocument = (command) => {
 };
 
 const requiresActiveDocument = (command) => {
-    return !["createDocument", "openFile"].includes(command.action);
+    return !["createDocument", "openFile", "runBatch"].includes(command.action);
 };
 
 const commandHandlers = {
@@ -76,7 +142,8 @@ const commandHandlers = {
     ...core.commandHandlers,
     ...adjustmentLayers.commandHandlers,
     ...layerStyles.commandHandlers,
-    ...layers.commandHandlers
+    ...layers.commandHandlers,
+    runBatch,
 };
 
 module.exports = {
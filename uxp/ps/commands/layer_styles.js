@@ -122,7 +122,7 @@ const addDropShadowLayerStyle = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const addStrokeLayerStyle = async (command) => {
@@ -210,7 +210,7 @@ const addStrokeLayerStyle = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 }
 
 const createGradientLayerStyle = async (command) => {
@@ -307,7 +307,7 @@ const createGradientLayerStyle = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 
@@ -35,11 +35,16 @@ const {
     getJustificationMode,
     selectLayer,
     hasActiveSelection,
+    isCancelled,
+    checkCancelled,
     _saveDocumentAs,
     convertFontSize,
-    convertFromPhotoshopFontSize
+    convertFromPhotoshopFontSize,
+    getTargetSize
 } = require("./utils");
 
+const { getActiveHistoryStateId } = require("./revision");
+
 
 // Function to capture visibility state
 const _captureVisibilityState = (layers) => {
@@ -59,7 +64,7 @@ const _captureVisibilityState = (layers) => {
 };
 
 // Function to restore visibility state
-const _restoreVisibilityState = async (state) => {
+const _restoreVisibilityState = async (state, command) => {
     const restore = (layerSet) => {
         for (const layer of layerSet) {
             if (state.has(layer.id)) {
@@ -74,7 +79,7 @@ const _restoreVisibilityState = async (state) => {
 
     await execute(async () => {
         restore(app.activeDocument.layers);
-    });
+    }, command);
 };
 
 const exportLayersAsPng = async (command) => {
@@ -88,9 +93,13 @@ const exportLayersAsPng = async (command) => {
     await execute(async () => {
         originalState = _captureVisibilityState(app.activeDocument.layers);
         setVisibleAllLayers(false);
-    });
+    }, command);
 
     for (const info of layersInfo) {
+        if (isCancelled(command)) {
+            break;
+        }
+
         let result = {};
 
         let layer = findLayer(info.layerId);
@@ -103,9 +112,9 @@ const exportLayersAsPng = async (command) => {
             }
             await execute(async () => {
                 layer.visible = true;
-            });
+            }, command);
 
-            let tmp = await _saveDocumentAs(info.filePath, "PNG");
+            let tmp = await _saveDocumentAs(info.filePath, "PNG", command);
 
             result = {
                 ...tmp,
@@ -123,16 +132,20 @@ const exportLayersAsPng = async (command) => {
             if (layer) {
                 await execute(async () => {
                     layer.visible = false;
-                });
+                }, command);
             }
         }
 
         results.push(result);
     }
 
-    await execute(async () => {
-        await _restoreVisibilityState(originalState);
-    })
+    await _restoreVisibilityState(originalState, command);
+
+    if (isCancelled(command)) {
+        throw new Error(
+            `exportLayersAsPng : Cancelled after exporting ${results.length} of ${layersInfo.length} layers`
+        );
+    }
 
     return results;
 };
@@ -156,7 +169,7 @@ const scaleLayer = async (command) => {
         await layer.scale(options.width, options.height, anchor, {
             interpolation: interpolation,
         });
-    });
+    }, command);
 };
 
 const rotateLayer = async (command) => {
@@ -180,7 +193,7 @@ const rotateLayer = async (command) => {
         await layer.rotate(options.angle, anchor, {
             interpolation: interpolation,
         });
-    });
+    }, command);
 };
 
 const flipLayer = async (command) => {
@@ -197,7 +210,7 @@ const flipLayer = async (command) => {
 
     await execute(async () => {
         await layer.flip(options.axis);
-    });
+    }, command);
 };
 
 const deleteLayer = async (command) => {
@@ -214,7 +227,7 @@ const deleteLayer = async (command) => {
 
     await execute(async () => {
         layer.delete();
-    });
+    }, command);
 };
 
 const renameLayer = async (command) => {
@@ -223,10 +236,10 @@ const renameLayer = async (command) => {
     let layerId = options.layerId;
     let newLayerName = options.newLayerName;
 
-    await _renameLayer(layerId, newLayerName)
+    await _renameLayer(layerId, newLayerName, command)
 };
 
-const _renameLayer = async (layerId, layerName) => {
+const _renameLayer = async (layerId, layerName, command) => {
 
     let layer = findLayer(layerId);
 
@@ -238,7 +251,7 @@ const _renameLayer = async (layerId, layerName) => {
 
     await execute(async () => {
         layer.name = layerName;
-    });
+    }, command);
 }
 
 const renameLayers = async (command) => {
@@ -247,7 +260,7 @@ const renameLayers = async (command) => {
     let data = options.layerData;
 
     for(const d of data) {
-        await _renameLayer(d.layer_id, d.new_layer_name)
+        await _renameLayer(d.layer_id, d.new_layer_name, command)
     }
 };
 
@@ -275,7 +288,7 @@ const groupLayers = async (command) => {
             name: options.groupName,
             fromLayers: layers,
         });
-    });
+    }, command);
 };
 
 const setLayerVisibility = async (command) => {
@@ -292,7 +305,7 @@ const setLayerVisibility = async (command) => {
 
     await execute(async () => {
         layer.visible = options.visible;
-    });
+    }, command);
 };
 
 const translateLayer = async (command) => {
@@ -309,7 +322,7 @@ const translateLayer = async (command) => {
 
     await execute(async () => {
         await layer.translate(options.xOffset, options.yOffset);
-    });
+    }, command);
 };
 
 const setLayerProperties = async (command) => {
@@ -355,7 +368,7 @@ const setLayerProperties = async (command) => {
 
             await action.batchPlay([command], {});
         }
-    });
+    }, command);
 };
 
 const duplicateLayer = async (command) => {
@@ -372,7 +385,7 @@ const duplicateLayer = async (command) => {
 
         let d = await layer.duplicate();
         d.name = options.duplicateLayerName;
-    });
+    }, command);
 };
 
 const flattenAllLayers = async (command) => {
@@ -391,7 +404,7 @@ const flattenAllLayers = async (command) => {
         let l = layers[0];
         l.allLocked = false;
         l.name = layerName;
-    });
+    }, command);
 };
 
 const getLayerBounds = async (command) => {
@@ -424,7 +437,7 @@ const rasterizeLayer = async (command) => {
 
     await execute(async () => {
         layer.rasterize(constants.RasterizeType.ENTIRELAYER);
-    });
+    }, command);
 };
 
 const editTextLayer = async (command) => {
@@ -470,7 +483,7 @@ const editTextLayer = async (command) => {
         if (fontName != undefined) {
             layer.textItem.characterStyle.font = fontName;
         }
-    });
+    }, command);
 }
 
 const moveLayer = async (command) => {
@@ -525,7 +538,7 @@ const moveLayer = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const createMultiLineTextLayer = async (command) => {
@@ -634,7 +647,7 @@ const createMultiLineTextLayer = async (command) => {
 
         a.textItem.contents = contents;
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const createSingleLineTextLayer = async (command) => {
@@ -662,7 +675,7 @@ const createSingleLineTextLayer = async (command) => {
         a.blendMode = getBlendMode(options.blendMode);
         a.name = options.layerName;
         a.opacity = options.opacity;
-    });
+    }, command);
 };
 
 const createPixelLayer = async (command) => {
@@ -679,7 +692,7 @@ const createPixelLayer = async (command) => {
             fillNeutral: options.fillNeutral,
             blendMode: b,
         });
-    });
+    }, command);
 };
 
 
@@ -739,11 +752,115 @@ const getLayers = async (command) => {
         result = processLayers(app.activeDocument.layers);
 
         return result;
+    }, command);
+
+    return out;
+};
+
+//Last layer tree sent for each open document, keyed by document id. Used
+//to send only what changed since the tree the client already has.
+const layerTreeSnapshots = {};
+
+//Flattens the nested tree from getLayers into a map of layer id to layer
+//info, recording each layer's parent and position within it
+const flattenLayers = (layers, parentId = null, out = {}) => {
+    layers.forEach((layer, index) => {
+        let { layers: children, ...info } = layer;
+
+        out[layer.id] = { ...info, parentId: parentId, index: index };
+
+        if (children) {
+            flattenLayers(children, layer.id, out);
+        }
     });
 
     return out;
 };
 
+//Returns the layers that were added, changed or removed since the tree
+//the client last received. base is the {documentId, revision} the client
+//has. If it does not match the last tree sent for the active document,
+//the whole tree is returned in added and baseRevision is null.
+//
+//Everything getLayers reports only changes through steps that add a
+//history state, so the layers are not walked again while the document is
+//still at the history state of the last snapshot.
+const getLayersDelta = async (base) => {
+    const doc = app.activeDocument;
+    const documentId = doc.id;
+    const historyStateId = getActiveHistoryStateId(doc);
+
+    const snapshot = layerTreeSnapshots[documentId];
+    const previous = snapshot ? snapshot.layers : {};
+
+    const unchanged =
+        snapshot &&
+        historyStateId !== null &&
+        historyStateId === snapshot.historyStateId;
+
+    let current = previous;
+    let added = [];
+    let changed = [];
+    let removed = [];
+
+    if (!unchanged) {
+        current = flattenLayers(await getLayers());
+
+        for (const id in current) {
+            if (!(id in previous)) {
+                added.push(current[id]);
+            } else if (
+                JSON.stringify(current[id]) !== JSON.stringify(previous[id])
+            ) {
+                changed.push(current[id]);
+            }
+        }
+
+        for (const id in previous) {
+            if (!(id in current)) {
+                removed.push(Number(id));
+            }
+        }
+    }
+
+    let revision = snapshot ? snapshot.revision : 0;
+    if (!snapshot || added.length || changed.length || removed.length) {
+        revision++;
+    }
+
+    layerTreeSnapshots[documentId] = {
+        revision: revision,
+        historyStateId: historyStateId,
+        layers: current,
+    };
+
+    const inSync =
+        snapshot &&
+        base &&
+        base.documentId === documentId &&
+        base.revision === snapshot.revision;
+
+    if (inSync) {
+        return {
+            documentId: documentId,
+            baseRevision: snapshot.revision,
+            revision: revision,
+            added: added,
+            changed: changed,
+            removed: removed,
+        };
+    }
+
+    return {
+        documentId: documentId,
+        baseRevision: null,
+        revision: revision,
+        added: Object.values(current),
+        changed: [],
+        removed: [],
+    };
+};
+
 const removeLayerMask = async (command) => {
     const options = command.options;
 
@@ -771,7 +888,7 @@ const removeLayerMask = async (command) => {
             },
         ];
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const addLayerMask = async (command) => {
@@ -811,7 +928,7 @@ const addLayerMask = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const harmonizeLayer = async (command) => {
@@ -828,6 +945,9 @@ const harmonizeLayer = async (command) => {
     }
 
     await execute(async () => {
+        //may have been cancelled while waiting for the modal scope
+        checkCancelled(command);
+
         selectLayer(layer, true);
 
         let commands = [
@@ -905,7 +1025,7 @@ const harmonizeLayer = async (command) => {
 
         let l = findLayer(layerId);
         l.name = newLayerName;
-    });
+    }, command);
 };
 
 const getLayerImage = async (command) => {
@@ -925,17 +1045,28 @@ const getLayerImage = async (command) => {
             applyAlpha: true,
             layerID:layerId
         };
+
+        const bounds = layer.bounds;
+        const targetSize = getTargetSize(
+            bounds.right - bounds.left,
+            bounds.bottom - bounds.top,
+            options.maxEdge
+        );
+        if (targetSize) {
+            pixelsOpt.targetSize = targetSize;
+        }
         
         const imgObj = await imaging.getPixels(pixelsOpt);
 
-        const base64Data = await imaging.encodeImageData({
+        //sent as raw bytes, which socket.io passes as a binary attachment
+        //rather than as base64 text inside the JSON payload
+        const jpegData = await imaging.encodeImageData({
             imageData: imgObj.imageData,
-            base64: true,
+            base64: false,
         });
 
         const result = {
-            base64Image: base64Data,
-            dataUrl: `data:image/jpeg;base64,${base64Data}`,
+            image: new Uint8Array(jpegData),
             width: imgObj.imageData.width,
             height: imgObj.imageData.height,
             colorSpace: imgObj.imageData.colorSpace,
@@ -945,7 +1076,7 @@ const getLayerImage = async (command) => {
 
         imgObj.imageData.dispose();
         return result;
-    });
+    }, command);
 
     return out;
 };
@@ -980,4 +1111,5 @@ const commandHandlers = {
 
 module.exports = {
     commandHandlers,
+    getLayersDelta,
 };
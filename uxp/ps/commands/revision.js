@@ -0,0 +1,137 @@
+/* MIT License
+ *
+ * Copyright (c) 2025 Mike Chambers
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in all
+ * copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+ * SOFTWARE.
+ */
+
+const app = require("photoshop").app;
+
+//Commands that never change the pixels of a document
+const NON_PIXEL_ACTIONS = [
+    "getLayers",
+    "getLayerBounds",
+    "getLayerImage",
+    "getDocumentInfo",
+    "getDocuments",
+    "getDocumentImage",
+    "setActiveDocument",
+    "renameLayer",
+    "renameLayers",
+    "selectRectangle",
+    "selectEllipse",
+    "selectPolygon",
+    "selectSubject",
+    "selectSky",
+    "invertSelection",
+    "clearSelection",
+    "copySelectionToClipboard",
+    "copyMergedSelectionToClipboard",
+    "saveDocument",
+    "saveDocumentAs",
+    "exportLayersAsPng",
+];
+
+//Pixel revision and last seen history state for each open document, keyed
+//by document id
+let revisions = new Map();
+let nextRevision = 1;
+
+const getActiveHistoryStateId = (doc) => {
+    try {
+        return doc.activeHistoryState.id;
+    } catch (e) {
+        return null;
+    }
+};
+
+const getEntry = (doc) => {
+    let entry = revisions.get(doc.id);
+
+    if (!entry) {
+        entry = {
+            revision: nextRevision++,
+            historyStateId: getActiveHistoryStateId(doc),
+        };
+        revisions.set(doc.id, entry);
+    }
+
+    return entry;
+};
+
+//Bumps the revision of the active document if its history has moved since
+//we last looked, which means it was edited directly in Photoshop. Call
+//before a command runs.
+const syncPixelRevision = () => {
+    const doc = app.activeDocument;
+    if (!doc) {
+        return;
+    }
+
+    let entry = getEntry(doc);
+    let historyStateId = getActiveHistoryStateId(doc);
+
+    if (historyStateId !== entry.historyStateId) {
+        entry.revision = nextRevision++;
+        entry.historyStateId = historyStateId;
+    }
+};
+
+//Updates the revision of the active document after a command has run, and
+//returns it so it can be sent with the response. Returns null if there is
+//no open document.
+const updatePixelRevision = (command) => {
+    const doc = app.activeDocument;
+    if (!doc) {
+        return null;
+    }
+
+    let entry = getEntry(doc);
+    let historyStateId = getActiveHistoryStateId(doc);
+
+    //Some changes, such as layer visibility, don't add a history state by
+    //default, so any command that can change pixels bumps the revision
+    //whether or not the history moved
+    if (!NON_PIXEL_ACTIONS.includes(command.action)) {
+        entry.revision = nextRevision++;
+    }
+    entry.historyStateId = historyStateId;
+
+    //drop documents that have been closed
+    const openIds = new Set();
+    for (const d of app.documents) {
+        openIds.add(d.id);
+    }
+    for (const id of revisions.keys()) {
+        if (!openIds.has(id)) {
+            revisions.delete(id);
+        }
+    }
+
+    return {
+        documentId: doc.id,
+        revision: entry.revision,
+    };
+};
+
+module.exports = {
+    syncPixelRevision,
+    updatePixelRevision,
+    getActiveHistoryStateId,
+};
@@ -52,7 +52,7 @@ const createMaskFromSelection = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const selectSubject = async (command) => {
@@ -80,7 +80,7 @@ const selectSubject = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const selectSky = async (command) => {
@@ -107,7 +107,7 @@ const selectSky = async (command) => {
 
         await action.batchPlay(commands, {});
 
-    });
+    }, command);
 };
 
 const cutSelectionToClipboard = async (command) => {
@@ -139,7 +139,7 @@ const cutSelectionToClipboard = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const copyMergedSelectionToClipboard = async (command) => {
@@ -158,7 +158,7 @@ const copyMergedSelectionToClipboard = async (command) => {
         }];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const copySelectionToClipboard = async (command) => {
@@ -189,7 +189,7 @@ const copySelectionToClipboard = async (command) => {
         }];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const pasteFromClipboard = async (command) => {
@@ -225,7 +225,7 @@ const pasteFromClipboard = async (command) => {
         ];
 
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const deleteSelection = async (command) => {
@@ -252,7 +252,7 @@ const deleteSelection = async (command) => {
             },
         ];
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const fillSelection = async (command) => {
@@ -300,7 +300,7 @@ const fillSelection = async (command) => {
             },
         ];
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const selectPolygon = async (command) => {
@@ -325,7 +325,7 @@ const selectPolygon = async (command) => {
             options.feather,
             options.antiAlias
         );
-    });
+    }, command);
 };
 
 let selectEllipse = async (command) => {
@@ -350,7 +350,7 @@ let selectEllipse = async (command) => {
             options.feather,
             options.antiAlias
         );
-    });
+    }, command);
 };
 
 const selectRectangle = async (command) => {
@@ -373,7 +373,7 @@ const selectRectangle = async (command) => {
             options.feather,
             options.antiAlias
         );
-    });
+    }, command);
 };
 
 const invertSelection = async (command) => {
@@ -389,7 +389,7 @@ const invertSelection = async (command) => {
             },
         ];
         await action.batchPlay(commands, {});
-    });
+    }, command);
 };
 
 const commandHandlers = {
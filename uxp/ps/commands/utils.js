@@ -181,7 +181,7 @@ const findLayerByName = (name, layers) => {
     return app.activeDocument.layers.getByName(name);
 };
 
-const _saveDocumentAs = async (filePath, fileType) => {
+const _saveDocumentAs = async (filePath, fileType, command) => {
 
     let url = await createFile(filePath)
 
@@ -209,19 +209,71 @@ const _saveDocumentAs = async (filePath, fileType) => {
         }
 
         return {savedFilePath:saveFile.nativePath}
-    });
+    }, command);
 };
 
-const execute = async (callback, commandName = "Executing command...") => {
+//Runs callback in a modal scope for command. Commands run as part of a
+//batch carry the batch's modal context in batchContext, and run in it
+//instead of starting a scope of their own.
+//
+//If options.historyName is set, the history of the active document is
+//suspended while callback runs, so everything it does becomes a single
+//history state with that name. If callback throws, the document is rolled
+//back to where it was before callback ran.
+const execute = async (callback, command = null, options = {}) => {
+    if (command && command.batchContext) {
+        return await callback(command.batchContext);
+    }
+
     try {
-        return await core.executeAsModal(callback, {
-            commandName: commandName,
-        });
+        return await core.executeAsModal(
+            async (context) => {
+                if (!options.historyName) {
+                    return await callback(context);
+                }
+
+                return await runInHistorySuspension(
+                    context,
+                    callback,
+                    options.historyName
+                );
+            },
+            {
+                commandName: options.commandName || "Executing command...",
+            }
+        );
     } catch (e) {
         throw new Error(`Error executing command [modal] : ${e}`);
     }
 };
 
+const runInHistorySuspension = async (context, callback, historyName) => {
+    const doc = app.activeDocument;
+    if (!doc) {
+        throw new Error(
+            "runInHistorySuspension : Requires an open Photoshop document"
+        );
+    }
+
+    const hostControl = context.hostControl;
+    const suspensionID = await hostControl.suspendHistory({
+        documentID: doc.id,
+        name: historyName,
+    });
+
+    let result;
+    try {
+        result = await callback(context);
+    } catch (e) {
+        //roll the document back to where it was before the suspension
+        await hostControl.resumeHistory(suspensionID, false);
+        throw e;
+    }
+
+    await hostControl.resumeHistory(suspensionID, true);
+    return result;
+};
+
 const tokenify = async (url) => {
     let out = await fs.createSessionToken(
         await fs.getEntryWithUrl("file:" + url)
@@ -233,6 +285,72 @@ const getElementPlacement = (placement) => {
     return constants.ElementPlacement[placement.toUpperCase()];
 };
 
+//Returns the getPixels targetSize that scales the longest edge down to
+//maxEdge, keeping the aspect ratio, or undefined if no scaling is needed
+const getTargetSize = (width, height, maxEdge) => {
+    if (!maxEdge || Math.max(width, height) <= maxEdge) {
+        return undefined;
+    }
+
+    return width >= height ? { width: maxEdge } : { height: maxEdge };
+};
+
+//requestId -> true if the sender has asked for it to be cancelled, for
+//every command that is running. Long running commands check this between
+//steps and stop early, so the host is free for the next command.
+const runningRequests = new Map();
+
+const startRequest = (command) => {
+    if (command.requestId) {
+        runningRequests.set(command.requestId, false);
+    }
+};
+
+const finishRequest = (command) => {
+    runningRequests.delete(command.requestId);
+};
+
+//returns false if the command is not running
+const cancelRequest = (requestId) => {
+    if (!runningRequests.has(requestId)) {
+        return false;
+    }
+
+    runningRequests.set(requestId, true);
+    return true;
+};
+
+//commands run as part of a batch are cancelled with the batch
+const isCancelled = (command) => {
+    return (
+        runningRequests.get(command.requestId) === true ||
+        runningRequests.get(command.batchRequestId) === true
+    );
+};
+
+const checkCancelled = (command) => {
+    if (isCancelled(command)) {
+        throw new Error(`${command.action} was cancelled`);
+    }
+};
+
+//Commands carry a deadline, in milliseconds since the epoch, after which
+//the sender has stopped waiting for the response. Running them after that
+//would only compete with the sender's retry.
+const isExpired = (command) => {
+    return command.deadline !== undefined && Date.now() > command.deadline;
+};
+
+//Fills in the response to a command that was not run because it expired
+const createExpiredResponse = (out, command) => {
+    out.status = "FAILURE";
+    out.errorCode = "DEADLINE_EXCEEDED";
+    out.message = `${command.action} was not run because its deadline passed ${
+        Date.now() - command.deadline
+    } ms ago`;
+    return out;
+};
+
 const hasActiveSelection = () => {
     return app.activeDocument.selection.bounds != null;
 };
@@ -346,5 +464,13 @@ module.exports = {
     execute,
     tokenify,
     getElementPlacement,
-    hasActiveSelection
+    hasActiveSelection,
+    getTargetSize,
+    isExpired,
+    createExpiredResponse,
+    startRequest,
+    finishRequest,
+    cancelRequest,
+    isCancelled,
+    checkCancelled
 }
\ No newline at end of file
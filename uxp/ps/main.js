@@ -27,9 +27,23 @@ const {
     parseAndRouteCommand,
 } = require("./commands/index.js");
 
-const { hasActiveSelection, generateDocumentInfo } = require("./commands/utils.js");
+const {
+    hasActiveSelection,
+    generateDocumentInfo,
+    isExpired,
+    createExpiredResponse,
+    startRequest,
+    finishRequest,
+    cancelRequest,
+    isCancelled,
+} = require("./commands/utils.js");
+
+const { getLayersDelta } = require("./commands/layers.js");
 
-const { getLayers } = require("./commands/layers.js").commandHandlers;
+const {
+    syncPixelRevision,
+    updatePixelRevision,
+} = require("./commands/revision.js");
 
 const { io } = require("./socket.io.js");
 //const { act } = require("react");
@@ -38,39 +52,86 @@ const app = require("photoshop").app;
 const APPLICATION = "photoshop";
 const PROXY_URL = "http://localhost:3001";
 
+//identifies this running copy of the application to the proxy, so commands
+//can be routed to it when more than one instance is connected
+const INSTANCE_ID = `${APPLICATION}-${Date.now().toString(36)}-${Math.random()
+    .toString(36)
+    .slice(2, 8)}`;
+
+//how often, in milliseconds, the plugin tells the proxy it is still alive.
+//The proxy stops routing commands to instances that miss several in a row.
+const HEARTBEAT_INTERVAL = 5000;
+
 let socket = null;
+let heartbeatTimer = null;
 
 const onCommandPacket = async (packet) => {
     let command = packet.command;
 
     let out = {
         senderId: packet.senderId,
+        requestId: packet.requestId,
+        instanceId: INSTANCE_ID,
     };
 
+    if (isExpired(command)) {
+        return createExpiredResponse(out, command);
+    }
+
+    startRequest(command);
+
     try {
         //this will throw if an active document is required and not open
         checkRequiresActiveDocument(command);
 
+        syncPixelRevision();
+
         let response = await parseAndRouteCommand(command);
 
         out.response = response;
         out.status = "SUCCESS";
 
-        let activeDocument = app.activeDocument
-        let doc = generateDocumentInfo(activeDocument, activeDocument)
-        out.document = doc;
-
-        out.layers = await getLayers();
-
-        out.hasActiveSelection = hasActiveSelection();
+        await appendDocumentState(out, command.include, command.layersBase);
     } catch (e) {
         out.status = "FAILURE";
         out.message = `Error calling ${command.action} : ${e}`;
+
+        if (isCancelled(command)) {
+            out.errorCode = "CANCELLED";
+        }
+    }
+
+    finishRequest(command);
+
+    //sent with every reply so the server knows when cached previews are stale
+    try {
+        out.pixelRevision = updatePixelRevision(command);
+    } catch (e) {
+        console.log(`Error updating pixel revision : ${e}`);
     }
 
     return out;
 };
 
+//Document state is only attached when the command asks for it, since
+//walking the layer tree is expensive on large documents. layersBase is the
+//layer tree revision the client already has, so only what changed since
+//then is sent.
+const appendDocumentState = async (out, include = [], layersBase = null) => {
+    if (include.includes("document")) {
+        let activeDocument = app.activeDocument;
+        out.document = generateDocumentInfo(activeDocument, activeDocument);
+    }
+
+    if (include.includes("layers")) {
+        out.layersDelta = await getLayersDelta(layersBase);
+    }
+
+    if (include.includes("selection")) {
+        out.hasActiveSelection = hasActiveSelection();
+    }
+};
+
 function connectToServer() {
     // Create new Socket.IO connection
     socket = io(PROXY_URL, {
@@ -80,7 +141,16 @@ function connectToServer() {
     socket.on("connect", () => {
         updateButton();
         console.log("Connected to server with ID:", socket.id);
-        socket.emit("register", { application: APPLICATION });
+        socket.emit("register", {
+            application: APPLICATION,
+            instanceId: INSTANCE_ID,
+            heartbeatInterval: HEARTBEAT_INTERVAL,
+        });
+
+        clearInterval(heartbeatTimer);
+        heartbeatTimer = setInterval(() => {
+            socket.emit("heartbeat");
+        }, HEARTBEAT_INTERVAL);
     });
 
     socket.on("command_packet", async (packet) => {
@@ -90,6 +160,11 @@ function connectToServer() {
         sendResponsePacket(response);
     });
 
+    socket.on("cancel_command", ({ requestId }) => {
+        console.log("Received cancel for request:", requestId);
+        cancelRequest(requestId);
+    });
+
     socket.on("registration_response", (data) => {
         console.log("Received response:", data);
         //TODO: connect button here
@@ -101,6 +176,8 @@ function connectToServer() {
     });
 
     socket.on("disconnect", (reason) => {
+        clearInterval(heartbeatTimer);
+        heartbeatTimer = null;
         updateButton();
         console.log("Disconnected from server. Reason:", reason);
 
@@ -0,0 +1,79 @@
+/* MIT License
+ *
+ * Copyright (c) 2025 Mike Chambers
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in all
+ * copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+ * SOFTWARE.
+ */
+
+//Run with: node --test test/
+
+const test = require("node:test");
+const assert = require("node:assert");
+const Module = require("module");
+
+//stand in for the photoshop module, which only exists inside Photoshop
+const doc = { id: 7, historyStateId: 1 };
+Object.defineProperty(doc, "activeHistoryState", {
+    get: () => ({ id: doc.historyStateId }),
+});
+
+const photoshop = { app: { activeDocument: doc, documents: [doc] } };
+
+const load = Module._load;
+Module._load = function (request, ...args) {
+    return request === "photoshop" ? photoshop : load.call(this, request, ...args);
+};
+
+const {
+    syncPixelRevision,
+    updatePixelRevision,
+} = require("../commands/revision.js");
+
+//the server caches previews by document id and revision, so a preview is
+//invalidated when the revision changes
+const runCommand = (action) => {
+    syncPixelRevision();
+    return updatePixelRevision({ action: action });
+};
+
+test("a visibility change invalidates the cached preview", () => {
+    const before = runCommand("getLayerImage");
+
+    //visibility changes don't add a history state by default
+    const after = runCommand("setLayerVisibility");
+
+    assert.strictEqual(doc.historyStateId, 1);
+    assert.notStrictEqual(after.revision, before.revision);
+});
+
+test("reading state keeps the cached preview", () => {
+    const before = runCommand("getLayerImage");
+    const after = runCommand("getDocumentImage");
+
+    assert.strictEqual(after.revision, before.revision);
+});
+
+test("an edit made by hand in Photoshop invalidates the cached preview", () => {
+    const before = runCommand("getLayerImage");
+
+    doc.historyStateId++;
+    const after = runCommand("getLayerImage");
+
+    assert.notStrictEqual(after.revision, before.revision);
+});